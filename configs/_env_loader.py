@@ -0,0 +1,18 @@
+"""Модуль однократного чтения переменных окружения"""
+
+from functools import lru_cache
+
+from environs import Env
+
+
+@lru_cache(maxsize=1)
+def load_env() -> Env:
+    """
+    Возвращает объект `Env` с прочитанным .env.
+
+    Файл читается и разбирается один раз за процесс; все модули
+    конфигурации получают один и тот же объект.
+    """
+    env = Env()
+    env.read_env()  # Читает из .env и системных переменных
+    return env
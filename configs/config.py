@@ -1,19 +1,17 @@
 """Модуль для конфигурации"""
 
-import sys
 from pathlib import Path
 
-from environs import Env
+from configs._env_loader import load_env
 
-# Добавляем src в путь импорта
-sys.path.append(str(Path(__file__).parent.parent / "src"))
-
-# Инициализация и чтение переменных окружения
-env = Env()
-env.read_env()  # Читает из .env и системных переменных
+# Переменные окружения (.env читается один раз за процесс)
+env = load_env()
 
 
 class Config:
+    # Все настройки — атрибуты класса, экземпляру __dict__ не нужен
+    __slots__ = ()
+
     # --- Пути и директории ---
     BASE_DIR = Path(__file__).parent.parent
 
@@ -22,13 +20,16 @@ class Config:
     if not TELEGRAM_BOT_TOKEN:
         raise ValueError("Отсутствует TELEGRAM_BOT_TOKEN.")
 
-    TELEGRAM_CHANNEL_IDS: list[int] = [
-        int(x) for x in env.list("TELEGRAM_CHANNEL_IDS", [])
-    ]
+    TELEGRAM_CHANNEL_IDS: tuple[int, ...] = tuple(
+        map(int, env.list("TELEGRAM_CHANNEL_IDS", []))
+    )
     if not TELEGRAM_CHANNEL_IDS:
         raise ValueError("Отсутствуют TELEGRAM_CHANNEL_IDS.")
 
-    TELEGRAM_ADMIN_IDS: list[int] = [int(x) for x in env.list("TELEGRAM_ADMIN_IDS", [])]
+    # frozenset: проверка прав администратора выполняется на каждом сообщении
+    TELEGRAM_ADMIN_IDS: frozenset[int] = frozenset(
+        map(int, env.list("TELEGRAM_ADMIN_IDS", []))
+    )
     if not TELEGRAM_ADMIN_IDS:
         raise ValueError("Отсутствуют TELEGRAM_ADMIN_IDS.")
 
@@ -43,6 +44,9 @@ class Config:
 
     GOOGLE_DRIVE_PATH: str = env.str("GOOGLE_DRIVE_PATH", "/content/drive/MyDrive/YARO")
 
+    # --- FSM (пусто — состояния хранятся в памяти процесса) ---
+    REDIS_URL: str = env.str("REDIS_URL", "")
+
     # --- Логирование ---
     LOG_LEVEL: str = env.str("LOG_LEVEL", "INFO").upper()
 
@@ -70,14 +74,14 @@ Config.check_credentials()
 config = Config()
 
 # === Заголовки таблицы в Google Sheets ===
-HEADERS = [
-    "id",  #
-    "name",  #
-    "username",  #
-    "Человек",  #
-    "Имя ссылки",  #
-    "Ссылка",  #
-    "Подписка/отписка",  #
+HEADERS: tuple[str, ...] = (
+    "id",
+    "name",
+    "username",
+    "Человек",
+    "Имя ссылки",
+    "Ссылка",
+    "Подписка/отписка",
     "Название канала",
-    "Дата",  #
-]
+    "Дата",
+)
@@ -3,13 +3,16 @@
 Содержит хэндлеры для работы с текстовыми командами и inline-кнопками.
 """
 
+from typing import Awaitable, Callable, Dict
+
 from aiogram import F, Router
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from configs.config import Config
-from handlers.links import cmd_create_link, handle_channel_selected
-from utils.logger import get_logger
+from src.handlers.links import cmd_create_link, handle_channel_selected
+from src.keyboards.keyboards import SelectChannelCB
+from src.utils.logger import get_logger
 
 # === Запускаем логирование ===
 logger = get_logger(__name__)
@@ -17,9 +20,12 @@ logger = get_logger(__name__)
 # === Роутер ===
 buttons_router = Router()
 
+# === Ссылка на Google Таблицу (ID таблицы не меняется во время работы) ===
+_SHEET_URL = f"https://docs.google.com/spreadsheets/d/{Config.SPREADSHEET_ID}/edit"
+_SHEET_MSG = f"📎 [Открыть Google Таблицу]({_SHEET_URL})"
+
 
 # === ХЭНДЛЕРЫ КНОПОК ===
-@buttons_router.message(F.text == "Создать ссылку")
 async def handle_create_link_button(message: Message, state: FSMContext):
     """
     Обрабатывает нажатие на текстовую кнопку "Создать ссылку".
@@ -36,8 +42,7 @@ async def handle_create_link_button(message: Message, state: FSMContext):
         await message.answer("⚠️ Произошла ошибка при создании ссылки")
 
 
-@buttons_router.message(F.text == "Открыть Google Таблицу")
-async def handle_open_sheet_button(message: Message):
+async def handle_open_sheet_button(message: Message, state: FSMContext):
     """
     Обрабатывает нажатие на кнопку "Открыть Google Таблицу".
     Отправляет ссылку на таблицу только администраторам.
@@ -47,27 +52,38 @@ async def handle_open_sheet_button(message: Message):
             await message.answer("⛔ У вас нет доступа")
             return
 
-        sheet_url = (
-            f"https://docs.google.com/spreadsheets/d/{Config.SPREADSHEET_ID}/edit"
-        )
-        await message.answer(
-            f"📎 [Открыть Google Таблицу]({sheet_url})", parse_mode="Markdown"
-        )
+        await message.answer(_SHEET_MSG, parse_mode="Markdown")
 
     except Exception as e:
         logger.error(f"Ошибка при открытии таблицы: {e}", exc_info=True)
         await message.answer("⚠️ Не удалось открыть Google Таблицу")
 
 
+# Текст кнопки → обработчик. Один хэндлер на все текстовые кнопки:
+# вместо последовательной проверки фильтров — один поиск по словарю.
+_TEXT_DISPATCH: Dict[str, Callable[[Message, FSMContext], Awaitable[None]]] = {
+    "Создать ссылку": handle_create_link_button,
+    "Открыть Google Таблицу": handle_open_sheet_button,
+}
+
+
+@buttons_router.message(F.text.in_(frozenset(_TEXT_DISPATCH)))
+async def handle_text_button(message: Message, state: FSMContext):
+    """Передаёт управление обработчику нажатой текстовой кнопки"""
+    await _TEXT_DISPATCH[message.text](message, state)
+
+
 # === CALLBACK HANDLERS ===
-@buttons_router.callback_query(F.data.startswith("select_channel:"))
-async def handle_select_channel_callback(callback: CallbackQuery, state: FSMContext):
+@buttons_router.callback_query(SelectChannelCB.filter())
+async def handle_select_channel_callback(
+    callback: CallbackQuery, callback_data: SelectChannelCB, state: FSMContext
+):
     """
     Обрабатывает выбор канала через inline-кнопку.
     Передаёт управление в `handle_channel_selected`.
     """
     try:
-        await handle_channel_selected(callback, state)
+        await handle_channel_selected(callback, callback_data, state)
     except Exception as e:
         logger.error(f"Ошибка при выборе канала: {e}", exc_info=True)
         await callback.answer("⚠️ Ошибка при выборе канала", show_alert=True)
@@ -4,26 +4,69 @@
 Содержит команды:
 - /create_link - создать новую пригласительную ссылку
 - /revoke_link - отозвать ранее созданную ссылку
+- /reload_channels - сбросить кэш названий каналов
 """
 
 from datetime import datetime, timedelta, timezone
 from html import escape
 
 from aiogram import Bot
+from aiogram.exceptions import TelegramAPIError
 from aiogram.fsm.context import FSMContext
-from aiogram.types import CallbackQuery, InlineKeyboardButton, Message
-from aiogram.utils.keyboard import InlineKeyboardBuilder
+from aiogram.types import CallbackQuery, Message
 
 from configs.config import Config
-from keyboards.keyboards import get_approval_type_keyboard
-from states.state import CreateLinkStates
-from utils.GoogleSheets import GoogleSheetsManager
-from utils.logger import get_logger
+from src.keyboards.keyboards import (
+    SelectChannelCB,
+    get_approval_type_keyboard,
+    get_channel_selection_keyboard,
+)
+from src.states.state import CreateLinkStates
+from src.utils.batcher import SheetBatcher
+from src.utils.cache import invalidate
+from src.utils.chat_titles import (
+    clear_chat_title_cache,
+    get_chat_title,
+)
+from src.utils.logger import get_logger
 
 # === Запускаем логирование ===
 logger = get_logger(__name__)
 
 
+def _invalidate_links(batch):
+    """Сбрасывает кэш списков ссылок каналов, для которых записаны новые ссылки"""
+    for channel_name in {link_data["Имя канала"] for link_data in batch}:
+        invalidate(("links", channel_name))
+
+
+# Очередь пакетной записи ссылок в Google Таблицу (запускается в main.py)
+invite_links_batcher = SheetBatcher(
+    "Пригласительные ссылки", after_flush=_invalidate_links
+)
+
+# Локальные привязки: без поиска атрибутов `datetime.now` / `timezone.utc` при вызове
+_UTC = timezone.utc
+_dt_now = datetime.now
+
+# Срок действия создаваемых пригласительных ссылок
+_LINK_TTL = timedelta(days=14)
+
+# Шаблон ответа о созданной ссылке
+_RESPONSE_TMPL = (
+    "🔗 <b>Новая ссылка:</b>\n\n"
+    "📛 <b>Название:</b> <code>{name}</code>\n"
+    "📣 <b>Канал:</b> <code>{chan}</code>\n"
+    "🔗 <b>Ссылка:</b> <a href='{url}'>{url_esc}</a>"
+)
+
+
+def reset_chat_title_cache() -> None:
+    """Сбрасывает кэш названий каналов (например, после переименования канала)"""
+    clear_chat_title_cache()
+    logger.info("Кэш названий каналов сброшен")
+
+
 # === ХЭНДЛЕРЫ КОМАНД ===
 async def cmd_create_link(message: Message, bot: Bot, state: FSMContext):
     """
@@ -40,42 +83,48 @@ async def cmd_create_link(message: Message, bot: Bot, state: FSMContext):
         return
 
     try:
-        # Формируем клавиатуру с доступными каналами
-        kb = InlineKeyboardBuilder()
-        for channel_id in Config.TELEGRAM_CHANNEL_IDS:
-            try:
-                chat = await bot.get_chat(channel_id)
-                title = chat.title or str(channel_id)
-            except Exception as e:
-                logger.warning(
-                    f"Не удалось получить информацию о канале {channel_id}: {e}"
-                )
-                title = str(channel_id)
-            kb.add(
-                InlineKeyboardButton(
-                    text=title, callback_data=f"select_channel:{channel_id}"
-                )
-            )
+        kb = await get_channel_selection_keyboard(bot)
 
         await state.set_state(CreateLinkStates.waiting_for_channel)
         await message.answer(
             "📢 Выберите канал, для которого создать ссылку:",
-            reply_markup=kb.as_markup(),
+            reply_markup=kb,
         )
 
-    except Exception as e:
-        logger.error(f"Ошибка при выборе канала: {e}", exc_info=True)
+    except TelegramAPIError as e:
+        # Ожидаемый отказ Telegram API — трассировка не нужна
+        logger.warning(f"Telegram API отклонил запрос при выборе канала: {e}")
+        await message.answer("⚠️ Произошла ошибка при выборе канала.")
+    except Exception:
+        logger.exception("Ошибка при выборе канала")
         await message.answer("⚠️ Произошла ошибка при выборе канала.")
 
 
-async def handle_channel_selected(callback: CallbackQuery, state: FSMContext):
+async def cmd_reload_channels(message: Message):
+    """
+    Команда `/reload_channels` — сбрасывает кэш названий каналов.
+
+    Полезна после переименования канала, чтобы не ждать истечения кэша.
+    """
+    if message.from_user.id not in Config.TELEGRAM_ADMIN_IDS:
+        await message.answer(
+            "⛔ У вас нет прав для выполнения этой команды. Обратитесь к администратору"
+        )
+        return
+
+    reset_chat_title_cache()
+    await message.answer("🔄 Кэш названий каналов сброшен")
+
+
+async def handle_channel_selected(
+    callback: CallbackQuery, callback_data: SelectChannelCB, state: FSMContext
+):
     """
     Обработчик выбора канала через inline-кнопку.
     Сохраняет выбранный канал в состоянии и запрашивает тип одобрения.
     """
     try:
-        channel_id = callback.data.split("select_channel:")[1]
-        await state.update_data(selected_channel=channel_id)
+        await state.update_data(selected_channel=callback_data.channel_id)
         await state.set_state(CreateLinkStates.waiting_for_approval_type)
 
         await callback.message.edit_text(
@@ -97,8 +146,6 @@ async def handle_approval_type_selected(callback: CallbackQuery, state: FSMConte
     try:
         if callback.data == "back_to_channel_selection":
             # Возвращаем к выбору канала
-            from keyboards.keyboards import get_channel_selection_keyboard
-
             kb = await get_channel_selection_keyboard(callback.bot)
             await state.set_state(CreateLinkStates.waiting_for_channel)
             await callback.message.edit_text(
@@ -125,14 +172,12 @@ async def handle_approval_type_selected(callback: CallbackQuery, state: FSMConte
         await callback.answer("⚠️ Ошибка при выборе типа одобрения", show_alert=True)
 
 
-async def process_link_name(
-    message: Message, state: FSMContext, bot: Bot, gsheets: GoogleSheetsManager
-):
+async def process_link_name(message: Message, state: FSMContext, bot: Bot):
     """
     Обрабатывает введённое пользователем имя ссылки.
 
     Создаёт пригласительную ссылку через Telegram API,
-    сохраняет данные в Google Таблицу и отправляет ответ пользователю.
+    ставит данные в очередь на запись в Google Таблицу и отправляет ответ пользователю.
     """
     try:
         campaign_name = message.text.strip()
@@ -150,12 +195,12 @@ async def process_link_name(
 
         await state.clear()
 
-        # Получаем информацию о канале
-        chat = await bot.get_chat(channel_id)
-        channel_name = chat.title or str(channel_id)
+        # Получаем название канала
+        channel_name = await get_chat_title(bot, channel_id)
 
         # Создаём пригласительную ссылку с заданным периодом действия
-        expire_date = datetime.now() + timedelta(days=14)
+        now = _dt_now(_UTC).replace(microsecond=0)
+        expire_date = now + _LINK_TTL
         invite_link = await bot.create_chat_invite_link(
             chat_id=channel_id,  # id канала
             name=campaign_name,  # имя ссылки
@@ -163,32 +208,39 @@ async def process_link_name(
             creates_join_request=approval_required,  # нужно ли одобрение админа для вступления
         )
 
-        # Подготавливаем данные для таблицы
+        # Подготавливаем данные для таблицы (дата в формате ДД.ММ.ГГГГ ЧЧ:ММ:СС)
         link_data = {
             "Имя ссылки": campaign_name,
             "Ссылка": invite_link.invite_link,
             "Имя канала": channel_name,
-            "Дата создания ссылки": datetime.now(timezone.utc)
-            .replace(microsecond=0)
-            .strftime("%d.%m.%Y %H:%M:%S"),
+            "Дата создания ссылки": (
+                f"{now.day:02d}.{now.month:02d}.{now.year} "
+                f"{now.hour:02d}:{now.minute:02d}:{now.second:02d}"
+            ),
         }
 
-        # Сохраняем в таблицу
-        gsheets.add_invite_link(link_data)
+        # Ставим в очередь на запись в таблицу (запишется фоновой задачей пакетом)
+        await invite_links_batcher.put(link_data)
 
         # Формируем и отправляем ответ
         approval_text = "с одобрением" if approval_required else "без одобрения"
-        response = (
-            f"🔗 <b>Новая ссылка:</b>\n\n"
-            f"📛 <b>Название:</b> <code>{escape(campaign_name)}</code>\n"
-            f"📣 <b>Канал:</b> <code>{escape(channel_name)}</code>\n"
-            f"🔗 <b>Ссылка:</b> <a href='{invite_link.invite_link}'>{escape(invite_link.invite_link)}</a>"
+        url = invite_link.invite_link
+        await message.answer(
+            _RESPONSE_TMPL.format(
+                name=escape(campaign_name),
+                chan=escape(channel_name),
+                url=url,
+                url_esc=escape(url),
+            )
         )
-        await message.answer(response)
         logger.info(
             f"Создана ссылка для канала {channel_id} ({channel_name}): {campaign_name} ({approval_text})"
         )
 
-    except Exception as e:
-        logger.error(f"Ошибка при создании ссылки: {e}", exc_info=True)
+    except TelegramAPIError as e:
+        # Например, у бота нет прав на создание ссылок в канале
+        logger.warning(f"Telegram API отклонил создание ссылки: {e}")
+        await message.answer("⚠️ Произошла ошибка при создании ссылки.")
+    except Exception:
+        logger.exception("Ошибка при создании ссылки")
         await message.answer("⚠️ Произошла ошибка при создании ссылки.")
@@ -2,18 +2,25 @@
 Модуль управления заявками на вступление в канал
 """
 
+import asyncio
+from typing import Any, Awaitable, Callable
+
 from aiogram import F, Router
+from aiogram.exceptions import TelegramRetryAfter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
+from aiolimiter import AsyncLimiter
 
 from configs.config import Config
-from keyboards.keyboards import (
+from src.keyboards.keyboards import (
     get_back_to_channels_keyboard,
     get_channel_selection_keyboard,
     get_request_management_keyboard,
 )
-from states.state import RequestManagementStates
-from utils.logger import get_logger
+from src.states.state import RequestManagementStates
+from src.utils.cache import cached_read, invalidate
+from src.utils.formatting import escape_html
+from src.utils.logger import get_logger
 
 # === Запускаем логирование ===
 logger = get_logger(__name__)
@@ -21,6 +28,28 @@ logger = get_logger(__name__)
 # === Роутер ===
 requests_router = Router()
 
+# Префикс callback-данных кнопок выбора канала
+_PFX_MRC = "manage_requests_channel:"
+
+# Ограничение частоты массовых запросов к Telegram API (лимит ~30 запросов/сек)
+_tg_limiter = AsyncLimiter(25, 1)
+
+
+async def _limited_call(method: Callable[..., Awaitable[Any]], **kwargs) -> Any:
+    """
+    Вызывает метод Telegram API с учётом ограничения частоты.
+    При ответе 429 (TelegramRetryAfter) ждёт указанное время и повторяет запрос один раз.
+    """
+    async with _tg_limiter:
+        try:
+            return await method(**kwargs)
+        except TelegramRetryAfter as e:
+            logger.warning(
+                f"Превышен лимит Telegram API, повтор через {e.retry_after} с"
+            )
+            await asyncio.sleep(e.retry_after)
+            return await method(**kwargs)
+
 
 @requests_router.message(F.text == "Управление заявками")
 async def handle_manage_requests_button(message: Message, state: FSMContext):
@@ -51,21 +80,25 @@ async def handle_manage_requests_button(message: Message, state: FSMContext):
         await message.answer("⚠️ Произошла ошибка при выборе канала")
 
 
-@requests_router.callback_query(F.data.startswith("manage_requests_channel:"))
+@requests_router.callback_query(F.data.startswith(_PFX_MRC))
 async def handle_channel_selection_callback(callback: CallbackQuery, state: FSMContext):
     """
     Обрабатывает выбор канала для управления заявками через inline-кнопку.
     """
     try:
         # Извлекаем ID канала из callback данных
-        channel_id = callback.data.split("manage_requests_channel:")[1]
+        channel_id = callback.data[len(_PFX_MRC) :]
 
         # Сохраняем выбранный канал в состоянии
         await state.update_data(selected_channel=channel_id)
 
         # Получаем список заявок из Google Sheets
         try:
-            pending_requests = callback.bot.gsheets.get_pending_requests(channel_id)
+            pending_requests = await cached_read(
+                ("pending", channel_id),
+                callback.bot.gsheets.get_pending_requests,
+                channel_id,
+            )
         except Exception as e:
             logger.error(f"Ошибка при получении заявок для канала {channel_id}: {e}")
             await callback.answer(
@@ -73,8 +106,20 @@ async def handle_channel_selection_callback(callback: CallbackQuery, state: FSMC
             )
             return
 
+        # ID сразу приводим к int, чтобы не преобразовывать их при каждой
+        # массовой операции; строки с пустым или испорченным ID пропускаем
+        requests_data = []
+        for req in pending_requests:
+            try:
+                requests_data.append({**req, "id": int(req.get("id", ""))})
+            except ValueError:
+                logger.warning(
+                    f"Пропущена заявка с некорректным ID {req.get('id')!r} "
+                    f"в канале {channel_id}"
+                )
+
         # Проверяем наличие заявок
-        if not pending_requests:
+        if not requests_data:
             keyboard = get_back_to_channels_keyboard()
             await callback.message.edit_text(
                 "📭 Нет заявок на вступление в этот канал", reply_markup=keyboard
@@ -82,20 +127,19 @@ async def handle_channel_selection_callback(callback: CallbackQuery, state: FSMC
             return
 
         # Сохраняем список заявок в состоянии
-        await state.update_data(requests_data=pending_requests)
+        await state.update_data(requests_data=requests_data)
 
         # Формируем сообщение со списком заявок
-        channel_name = (
-            pending_requests[0].get("channel_name", channel_id)
-            if pending_requests
-            else channel_id
-        )
-        text = f"📋 Заявки на вступление в канал {channel_name}:\n\n"
-
-        for i, req in enumerate(pending_requests, 1):
-            username = req.get("username", "")
-            name = req.get("name", f"ID: {req.get('id', 'N/A')}")
-            text += f"{i}. {name} {username}\n"
+        channel_name = requests_data[0].get("channel_name", channel_id)
+        # Данные в таблице хранятся без экранирования — экранируем при выводе
+        parts = [
+            f"📋 Заявки на вступление в канал {escape_html(str(channel_name))}:\n\n"
+        ]
+        for i, req in enumerate(requests_data, 1):
+            username = escape_html(req.get("username", ""))
+            name = escape_html(req.get("name", f"ID: {req.get('id', 'N/A')}"))
+            parts.append(f"{i}. {name} {username}\n")
+        text = "".join(parts)
 
         # Отображаем список заявок с кнопками управления
         keyboard = get_request_management_keyboard()
@@ -127,31 +171,40 @@ async def handle_accept_all_requests(callback: CallbackQuery, state: FSMContext)
             await callback.answer("⚠️ Ошибка: данные не найдены", show_alert=True)
             return
 
-        # Массовое одобрение заявок и перенос в основную таблицу
-        success_count = 0
-        approved_user_ids = []
-
-        for req in requests_data:
-            user_id = int(req.get("id"))
-            try:
-                # Одобряем заявку через Telegram API
-                result = await callback.bot.approve_chat_join_request(
-                    chat_id=channel_id, user_id=user_id
+        # Массовое одобрение заявок: запросы к Telegram API выполняются параллельно
+        user_ids = [req["id"] for req in requests_data]
+        results = await asyncio.gather(
+            *(
+                _limited_call(
+                    callback.bot.approve_chat_join_request,
+                    chat_id=channel_id,
+                    user_id=user_id,
                 )
+                for user_id in user_ids
+            ),
+            return_exceptions=True,
+        )
 
-                if result:
-                    success_count += 1
-                    approved_user_ids.append(str(user_id))
-                else:
-                    logger.error(f"Не удалось одобрить заявку пользователя {user_id}")
-
-            except Exception as e:
-                logger.error(f"Ошибка при одобрении заявки пользователя {user_id}: {e}")
+        approved_user_ids = []
+        for user_id, result in zip(user_ids, results):
+            if result is True:
+                approved_user_ids.append(str(user_id))
+            elif isinstance(result, Exception):
+                logger.error(
+                    f"Ошибка при одобрении заявки пользователя {user_id}: {result}"
+                )
+            else:
+                logger.error(f"Не удалось одобрить заявку пользователя {user_id}")
+        success_count = len(approved_user_ids)
+        invalidate(("pending", channel_id))
 
         # Переносим одобренные заявки в основную таблицу
         if approved_user_ids:
             try:
-                callback.bot.gsheets.move_requests_to_main_sheet(approved_user_ids)
+                await asyncio.to_thread(
+                    callback.bot.gsheets.move_requests_to_main_sheet,
+                    approved_user_ids,
+                )
             except Exception as e:
                 logger.error(f"Ошибка при переносе заявок в основную таблицу: {e}")
 
@@ -187,33 +240,40 @@ async def handle_decline_all_requests(callback: CallbackQuery, state: FSMContext
             await callback.answer("⚠️ Ошибка: данные не найдены", show_alert=True)
             return
 
-        # Массовое отклонение заявок
-        success_count = 0
-        declined_user_ids = []
-
-        for req in requests_data:
-            user_id = int(req.get("id"))
-            try:
-                # Отклоняем заявку через Telegram API
-                result = await callback.bot.decline_chat_join_request(
-                    chat_id=channel_id, user_id=user_id
+        # Массовое отклонение заявок: запросы к Telegram API выполняются параллельно
+        user_ids = [req["id"] for req in requests_data]
+        results = await asyncio.gather(
+            *(
+                _limited_call(
+                    callback.bot.decline_chat_join_request,
+                    chat_id=channel_id,
+                    user_id=user_id,
                 )
+                for user_id in user_ids
+            ),
+            return_exceptions=True,
+        )
 
-                if result:
-                    success_count += 1
-                    declined_user_ids.append(str(user_id))
-                else:
-                    logger.error(f"Не удалось отклонить заявку пользователя {user_id}")
-
-            except Exception as e:
+        declined_user_ids = []
+        for user_id, result in zip(user_ids, results):
+            if result is True:
+                declined_user_ids.append(str(user_id))
+            elif isinstance(result, Exception):
                 logger.error(
-                    f"Ошибка при отклонении заявки пользователя {user_id}: {e}"
+                    f"Ошибка при отклонении заявки пользователя {user_id}: {result}"
                 )
+            else:
+                logger.error(f"Не удалось отклонить заявку пользователя {user_id}")
+        success_count = len(declined_user_ids)
+        invalidate(("pending", channel_id))
 
         # Удаляем отклоненные заявки из таблицы заявок
         if declined_user_ids:
             try:
-                callback.bot.gsheets.move_requests_to_main_sheet(declined_user_ids)
+                await asyncio.to_thread(
+                    callback.bot.gsheets.move_requests_to_main_sheet,
+                    declined_user_ids,
+                )
             except Exception as e:
                 logger.error(f"Ошибка при удалении отклоненных заявок: {e}")
 
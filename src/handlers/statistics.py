@@ -12,17 +12,24 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
 
 from configs.config import Config
-from keyboards.keyboards import (
+from src.keyboards.keyboards import (
     get_channel_statistics_keyboard,
     get_links_statistics_keyboard,
     get_main_menu_keyboard,
 )
-from states.state import StatisticsStates
-from utils.GoogleSheets import GoogleSheetsManager
-from utils.logger import get_logger
+from src.states.state import StatisticsStates
+from src.utils.cache import cached_read
+from src.utils.chat_titles import get_chat_title
+from src.utils.formatting import escape_html
+from src.utils.GoogleSheets import GoogleSheetsManager
+from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Префиксы callback-данных кнопок статистики
+_PFX_SC = "stats_channel:"
+_PFX_SL = "stats_link:"
+
 
 async def cmd_statistics(message: Message, bot: Bot, state: FSMContext):
     """
@@ -64,22 +71,23 @@ async def handle_channel_selected_for_stats(
             await callback.answer()
             return
 
-        channel_id = callback.data.split("stats_channel:")[1]
+        channel_id = callback.data[len(_PFX_SC) :]
 
         # Сохраняем выбранный канал
         await state.update_data(selected_channel=channel_id)
 
-        # Получаем информацию о канале
+        # Получаем название канала (из кэша, без запроса к Telegram API)
         try:
-            chat = await bot.get_chat(channel_id)
-            channel_name = chat.title or str(channel_id)
+            channel_name = await get_chat_title(bot, channel_id)
         except Exception:
             channel_name = str(channel_id)
 
         await state.update_data(channel_name=channel_name)
 
         # Получаем ссылки для этого канала из Google Sheets
-        links = gsheets.get_invite_links_for_channel(channel_name)
+        links = await cached_read(
+            ("links", channel_name), gsheets.get_invite_links_for_channel, channel_name
+        )
 
         if not links:
             await callback.message.edit_text(
@@ -130,17 +138,22 @@ async def handle_link_selected_for_stats(
             return
 
         # Получаем имя ссылки из callback_data
-        selected_link_name = callback.data.split("stats_link:")[1]
+        selected_link_name = callback.data[len(_PFX_SL) :]
+
+        # Ссылки канала нужны для клавиатуры в обоих вариантах ответа
+        channel_links = (await state.get_data()).get("channel_links", [])
 
         # Получаем подписчиков для этой ссылки
-        subscribers = gsheets.get_subscribers_for_link(selected_link_name)
+        subscribers = await cached_read(
+            ("subscribers", selected_link_name),
+            gsheets.get_subscribers_for_link,
+            selected_link_name,
+        )
 
         if not subscribers:
             await callback.message.edit_text(
                 f"❌ Для ссылки <b>{escape(selected_link_name)}</b> пока нет подписчиков.",
-                reply_markup=get_links_statistics_keyboard(
-                    (await state.get_data()).get("channel_links", [])
-                ),
+                reply_markup=get_links_statistics_keyboard(channel_links),
             )
             await callback.answer()
             return
@@ -152,9 +165,7 @@ async def handle_link_selected_for_stats(
         await callback.message.edit_text(
             f"👥 <b>Подписчики по ссылке:</b> <code>{escape(selected_link_name)}</code>\n\n"
             f"{subscribers_list}",
-            reply_markup=get_links_statistics_keyboard(
-                (await state.get_data()).get("channel_links", [])
-            ),
+            reply_markup=get_links_statistics_keyboard(channel_links),
         )
         await callback.answer()
 
@@ -166,29 +177,23 @@ async def handle_link_selected_for_stats(
 def format_subscribers_list(subscribers: List[Dict]) -> str:
     """
     Форматирует список подписчиков для отправки.
-    Делает username кликабельными и добавляет пустые строки для удобства чтения.
+    Делает username кликабельными и разделяет записи пустой строкой для удобства чтения.
     """
     if not subscribers:
         return "❌ Нет подписчиков"
 
-    formatted_list = []
+    esc = escape_html  # Локальная ссылка: без поиска глобального имени в цикле
+    entries = []
     for i, subscriber in enumerate(subscribers, 1):
         username = subscriber.get("username", "").strip()
         user_id = subscriber.get("id", "").strip()
 
         if username and username != "None":
             # Делаем username кликабельным
-            formatted_list.append(f"{i}. {escape(username)}")
+            entries.append(f"{i}. {esc(username)}")
         elif user_id and user_id != "None":
-            formatted_list.append(f"{i}. ID: {escape(str(user_id))}")
+            entries.append(f"{i}. ID: {esc(str(user_id))}")
         else:
-            formatted_list.append(f"{i}. Неизвестный пользователь")
-
-        # Добавляем пустую строку для удобства чтения
-        formatted_list.append("")
-
-    # Убираем последнюю пустую строку
-    if formatted_list and formatted_list[-1] == "":
-        formatted_list.pop()
+            entries.append(f"{i}. Неизвестный пользователь")
 
-    return "\n".join(formatted_list) if formatted_list else "❌ Нет подписчиков"
+    return "\n\n".join(entries)
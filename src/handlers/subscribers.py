@@ -2,36 +2,107 @@
 Хэндлер подписок
 """
 
-import html
-from datetime import datetime, timezone
+import time
 
 from aiogram import Bot
 from aiogram.enums import ChatMemberStatus
 from aiogram.types import ChatJoinRequest, ChatMemberUpdated
 
-from utils.GoogleSheets import GoogleSheetsManager
-from utils.logger import get_logger
+from configs.config import HEADERS
+from src.utils.batcher import SheetBatcher
+from src.utils.cache import invalidate
+from src.utils.GoogleSheets import GoogleSheetsManager
+from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Переходы статусов участника (frozenset: O(1) проверка без создания списка)
+JOIN_FROM = frozenset({ChatMemberStatus.LEFT, ChatMemberStatus.KICKED})
+LEAVE_FROM = frozenset({ChatMemberStatus.MEMBER, ChatMemberStatus.RESTRICTED})
+LEAVE_TO = frozenset({ChatMemberStatus.LEFT, ChatMemberStatus.KICKED})
 
-def create_user_data_dict(
+# Таблица переходов (старый статус, новый статус) → тип события:
+# одно обращение к словарю вместо двух проверок на каждое обновление
+_TRANSITIONS = {
+    **{(old, ChatMemberStatus.MEMBER): "join" for old in JOIN_FROM},
+    **{(old, new): "leave" for old in LEAVE_FROM for new in LEAVE_TO},
+}
+
+
+def _invalidate_pending(batch):
+    """Сбрасывает кэш заявок каналов, для которых записаны новые заявки"""
+    # channel_id — предпоследний столбец строки заявки
+    for channel_id in {row[-2] for row in batch}:
+        invalidate(("pending", channel_id))
+
+
+# Очереди пакетной записи в Google Таблицу (запускаются в main.py)
+subscribers_batcher = SheetBatcher("Подписчики", flush_interval=1.0)
+join_requests_batcher = SheetBatcher(
+    "Заявки на вступление", flush_interval=1.0, after_flush=_invalidate_pending
+)
+
+
+# Формат даты в таблице
+_TS_FMT = "%d.%m.%Y %H:%M:%S"
+
+# Строка текущего времени, отформатированная для таблицы: при всплеске событий
+# strftime вызывается не чаще раза в секунду
+_ts_cache = [0, ""]
+
+
+def _now_str() -> str:
+    """Возвращает текущее время UTC в формате ДД.ММ.ГГГГ ЧЧ:ММ:СС"""
+    t = int(time.time())
+    if t != _ts_cache[0]:
+        _ts_cache[0] = t
+        # time.gmtime + time.strftime — без создания объекта datetime
+        _ts_cache[1] = time.strftime(_TS_FMT, time.gmtime(t))
+    return _ts_cache[1]
+
+
+# Индекс столбца по заголовку: строка собирается сразу в порядке HEADERS,
+# без промежуточного словаря
+HEADER_INDEX = {h: i for i, h in enumerate(HEADERS)}
+_ROW_PROTO = [""] * len(HEADERS)
+
+
+def create_user_row(
     user, invite=None, subscription_type="Direct Join", channel_title=None
+) -> list[str]:
+    """
+    Создает строку данных пользователя для Google Sheets (в порядке HEADERS).
+
+    Значения записываются в таблицу как есть, без HTML-экранирования:
+    экранировать их нужно при выводе в сообщение с parse_mode=HTML.
+    """
+    row = _ROW_PROTO.copy()
+    row[HEADER_INDEX["id"]] = str(user.id)
+    row[HEADER_INDEX["name"]] = user.full_name or ""
+    if user.username:
+        row[HEADER_INDEX["username"]] = f"@{user.username}"
+    row[HEADER_INDEX["Человек"]] = "❌" if user.is_bot else "✅"
+    if invite:
+        row[HEADER_INDEX["Имя ссылки"]] = invite.name or ""
+        row[HEADER_INDEX["Ссылка"]] = invite.invite_link or ""
+    row[HEADER_INDEX["Подписка/отписка"]] = subscription_type
+    if channel_title:
+        row[HEADER_INDEX["Название канала"]] = channel_title
+    row[HEADER_INDEX["Дата"]] = _now_str()
+    return row
+
+
+async def handle_chat_member(
+    update: ChatMemberUpdated, bot: Bot, gsheets: GoogleSheetsManager
 ):
-    """Создает стандартный словарь данных пользователя для Google Sheets"""
-    return {
-        "id": user.id,
-        "name": html.escape(user.full_name) if user.full_name else "",
-        "username": f"@{html.escape(user.username)}" if user.username else "",
-        "Человек": "❌" if user.is_bot else "✅",
-        "Имя ссылки": html.escape(invite.name) if invite and invite.name else "",
-        "Ссылка": invite.invite_link if invite and invite.invite_link else "",
-        "Подписка/отписка": subscription_type,
-        "Название канала": channel_title if channel_title else "",
-        "Дата": datetime.now(timezone.utc)
-        .replace(microsecond=0)
-        .strftime("%d.%m.%Y %H:%M:%S"),
-    }
+    """Определяет тип перехода статуса участника и передаёт событие обработчику"""
+    kind = _TRANSITIONS.get(
+        (update.old_chat_member.status, update.new_chat_member.status)
+    )
+    if kind == "join":
+        await handle_new_member(update, bot, gsheets)
+    elif kind == "leave":
+        await handle_unsubscribed_member(update, bot, gsheets)
 
 
 async def handle_new_member(
@@ -39,33 +110,21 @@ async def handle_new_member(
 ):
     """Обрабатывает события, когда пользователь вступает в канал"""
     try:
-        if (
-            update.old_chat_member.status
-            in [ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]
-            and update.new_chat_member.status == ChatMemberStatus.MEMBER
-        ):
-            user = update.new_chat_member.user
-            invite = update.invite_link
-            channel_title = (
-                update.chat.title if update.chat and update.chat.title else None
-            )
-
-            # Определяем тип подписки
-            subscription_type = "✅" if invite else "Direct Join"
-
-            user_data = create_user_data_dict(
-                user, invite, subscription_type, channel_title
-            )
-            success = gsheets.add_subscriber(user_data)
-
-            if success:
-                logger.info(
-                    f"Новый подписчик добавлен в таблицу: {user.id} via {subscription_type} в канал {channel_title or 'Unknown'}"
-                )
-            else:
-                logger.error(
-                    f"Не удалось добавить нового подписчика в таблицу: {user.id}"
-                )
+        user = update.new_chat_member.user
+        if user.is_bot:
+            return  # Боты в таблицу не записываются
+        invite = update.invite_link
+        channel_title = update.chat.title if update.chat and update.chat.title else None
+
+        # Определяем тип подписки
+        subscription_type = "✅" if invite else "Direct Join"
+
+        user_row = create_user_row(user, invite, subscription_type, channel_title)
+        await subscribers_batcher.put(user_row)
+
+        logger.info(
+            f"Новый подписчик поставлен в очередь на запись: {user.id} via {subscription_type} в канал {channel_title or 'Unknown'}"
+        )
 
     except Exception as e:
         logger.error(f"Ошибка в handle_new_member: {e}", exc_info=True)
@@ -76,35 +135,23 @@ async def handle_unsubscribed_member(
 ):
     """Обрабатывает события, когда пользователь отписывается от канала"""
     try:
-        if update.old_chat_member.status in [
-            ChatMemberStatus.MEMBER,
-            ChatMemberStatus.RESTRICTED,
-        ] and update.new_chat_member.status in [
-            ChatMemberStatus.LEFT,
-            ChatMemberStatus.KICKED,
-        ]:
-            user = update.old_chat_member.user
-            channel_title = (
-                update.chat.title if update.chat and update.chat.title else None
-            )
-
-            # Для отписки invite link не применим
-            user_data = create_user_data_dict(user, None, "❌", channel_title)
-            success = gsheets.add_subscriber(user_data)
-
-            if success:
-                status_str = (
-                    "отписался"
-                    if update.new_chat_member.status == ChatMemberStatus.LEFT
-                    else "забанен"
-                )
-                logger.info(
-                    f"Пользователь {user.id} {status_str} от канала {channel_title or 'Unknown'}, запись добавлена в таблицу"
-                )
-            else:
-                logger.error(
-                    f"Не удалось добавить запись об отписке пользователя {user.id}"
-                )
+        user = update.old_chat_member.user
+        if user.is_bot:
+            return  # Боты в таблицу не записываются
+        channel_title = update.chat.title if update.chat and update.chat.title else None
+
+        # Для отписки invite link не применим
+        user_row = create_user_row(user, None, "❌", channel_title)
+        await subscribers_batcher.put(user_row)
+
+        status_str = (
+            "отписался"
+            if update.new_chat_member.status == ChatMemberStatus.LEFT
+            else "забанен"
+        )
+        logger.info(
+            f"Пользователь {user.id} {status_str} от канала {channel_title or 'Unknown'}, запись поставлена в очередь"
+        )
 
     except Exception as e:
         logger.error(f"Ошибка в handle_unsubscribed_member: {e}", exc_info=True)
@@ -118,38 +165,25 @@ async def handle_chat_join_request(
         user = update.from_user
         chat = update.chat
 
-        # Создаем данные для сохранения в таблицу заявок
-        request_data = create_user_data_dict(
+        # Создаем строку для таблицы заявок: стандартные столбцы + данные канала
+        request_row = create_user_row(
             user,
             update.invite_link,
             "Заявка на вступление",
             chat.title if chat and chat.title else None,
         )
-        request_data.update(
-            {
-                "channel_id": str(chat.id),
-                "channel_name": html.escape(chat.title) if chat.title else str(chat.id),
-            }
-        )
+        request_row += [str(chat.id), chat.title or str(chat.id)]
 
-        # Сохраняем заявку в лист "Заявки на вступление"
-        success = gsheets.add_join_request(request_data)
-
-        if success:
-            channel_name = (
-                chat.title
-                if chat and chat.title
-                else str(chat.id)
-                if chat
-                else "Unknown"
-            )
-            logger.info(
-                f"Новая заявка на вступление сохранена в таблицу: {user.id} в канал {channel_name}"
-            )
-        else:
-            logger.error(
-                f"Не удалось сохранить заявку в таблицу: {user.id} в канал {chat.title if chat and chat.title else 'Unknown'}"
-            )
+        # Ставим заявку в очередь на запись в лист "Заявки на вступление"
+        # (кэш заявок канала сбрасывается после записи пакета)
+        await join_requests_batcher.put(request_row)
+
+        channel_name = (
+            chat.title if chat and chat.title else str(chat.id) if chat else "Unknown"
+        )
+        logger.info(
+            f"Новая заявка на вступление поставлена в очередь: {user.id} в канал {channel_name}"
+        )
 
     except Exception as e:
         logger.error(f"Ошибка в handle_chat_join_request: {e}", exc_info=True)
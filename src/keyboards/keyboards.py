@@ -1,10 +1,22 @@
-from typing import Dict, List
+import asyncio
+from functools import lru_cache
+from typing import Dict, List, Tuple
 
 from aiogram import Bot
-from aiogram.types import InlineKeyboardMarkup, ReplyKeyboardMarkup
+from aiogram.filters.callback_data import CallbackData as CallbackFactory
+from aiogram.types import (
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    ReplyKeyboardMarkup,
+)
 from aiogram.utils.keyboard import InlineKeyboardBuilder, ReplyKeyboardBuilder
 
 from configs.config import Config
+from src.utils.chat_titles import get_chat_title
+from src.utils.logger import get_logger
+
+# === Запускаем логирование ===
+logger = get_logger(__name__)
 
 
 class CallbackData:
@@ -18,7 +30,18 @@ class CallbackData:
     BACK_TO_CHANNEL_STATS = "back_to_channel_stats"
 
 
+class SelectChannelCB(CallbackFactory, prefix=CallbackData.SELECT_CHANNEL):
+    """Callback-данные кнопки выбора канала (aiogram сам разбирает ID в int)"""
+
+    channel_id: int
+
+
+# Статические клавиатуры не меняются во время работы: каждая собирается один раз
+# (lru_cache), дальше возвращается тот же объект
+
+
 # Универсальная функция для кнопки "назад"
+@lru_cache(maxsize=32)
 def get_back_button(callback_data: str, text: str = "↩️ Назад") -> InlineKeyboardMarkup:
     builder = InlineKeyboardBuilder()
     builder.button(text=text, callback_data=callback_data)
@@ -26,6 +49,7 @@ def get_back_button(callback_data: str, text: str = "↩️ Назад") -> Inli
 
 
 # === Основные текстовые кнопки ===
+@lru_cache(maxsize=1)
 def get_main_menu_keyboard() -> ReplyKeyboardMarkup:
     """Возвращает основную клавиатуру с кнопками"""
     builder = ReplyKeyboardBuilder()
@@ -37,9 +61,35 @@ def get_main_menu_keyboard() -> ReplyKeyboardMarkup:
     return builder.as_markup(resize_keyboard=True, one_time_keyboard=False)
 
 
+async def _get_channel_titles(bot: Bot) -> List[Tuple[int, str]]:
+    """
+    Запрашивает названия всех каналов параллельно: [(channel_id, название), ...]
+
+    Названия берутся из кэша `chat_titles`, поэтому готовые клавиатуры
+    отдельно не кэшируются. Для каналов с ошибкой `get_chat` подставляется
+    "Канал {id}" — такие названия не кэшируются и запрашиваются снова.
+    """
+    results = await asyncio.gather(
+        *(
+            get_chat_title(bot, channel_id)
+            for channel_id in Config.TELEGRAM_CHANNEL_IDS
+        ),
+        return_exceptions=True,
+    )
+    titles = []
+    for channel_id, title in zip(Config.TELEGRAM_CHANNEL_IDS, results):
+        if isinstance(title, Exception):
+            logger.warning(
+                f"Не удалось получить информацию о канале {channel_id}: {title}"
+            )
+            title = f"Канал {channel_id}"
+        titles.append((channel_id, title))
+    return titles
+
+
 # === Inline клавиатуры ===
 async def get_channel_selection_keyboard(
-    bot: Bot, callback_prefix: str = "select_channel"
+    bot: Bot, callback_prefix: str = CallbackData.SELECT_CHANNEL
 ) -> InlineKeyboardMarkup:
     """
     Возвращает inline-клавиатуру с выбором каналов.
@@ -50,16 +100,12 @@ async def get_channel_selection_keyboard(
     """
     builder = InlineKeyboardBuilder()
 
-    for channel_id in Config.TELEGRAM_CHANNEL_IDS:
-        try:
-            chat = await bot.get_chat(channel_id)
-            channel_title = chat.title or f"Канал {channel_id}"
-        except Exception:
-            channel_title = f"Канал {channel_id}"
-
-        builder.button(
-            text=channel_title, callback_data=f"{callback_prefix}:{channel_id}"
-        )
+    for channel_id, channel_title in await _get_channel_titles(bot):
+        if callback_prefix == CallbackData.SELECT_CHANNEL:
+            callback_data = SelectChannelCB(channel_id=channel_id).pack()
+        else:
+            callback_data = f"{callback_prefix}:{channel_id}"
+        builder.button(text=channel_title, callback_data=callback_data)
 
     return builder.as_markup()
 
@@ -70,13 +116,7 @@ async def get_channel_statistics_keyboard(
     """Возвращает inline-клавиатуру с выбором каналов для статистики"""
     builder = InlineKeyboardBuilder()
 
-    for channel_id in Config.TELEGRAM_CHANNEL_IDS:
-        try:
-            chat = await bot.get_chat(channel_id)
-            channel_title = chat.title or f"Канал {channel_id}"
-        except Exception:
-            channel_title = f"Канал {channel_id}"
-
+    for channel_id, channel_title in await _get_channel_titles(bot):
         builder.button(
             text=channel_title, callback_data=f"{callback_prefix}:{channel_id}"
         )
@@ -86,6 +126,7 @@ async def get_channel_statistics_keyboard(
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1)
 def get_request_management_keyboard() -> InlineKeyboardMarkup:
     """Возвращает клавиатуру для управления заявками"""
     builder = InlineKeyboardBuilder()
@@ -102,17 +143,24 @@ def get_links_statistics_keyboard(
     """Возвращает inline-клавиатуру с выбором ссылок для статистики"""
     builder = InlineKeyboardBuilder()
 
+    # Клавиатура не кэшируется и собирается на каждый просмотр статистики:
+    # кнопки создаются через model_construct без валидации pydantic —
+    # текст и callback_data формируются здесь же, из строк таблицы.
+    # Методы связаны с локальными именами, чтобы не искать атрибуты в цикле
+    add = builder.add
+    make_button = InlineKeyboardButton.model_construct
     for i, link in enumerate(links[:15], 1):  # Ограничиваем 15 ссылками
-        link_name = link.get("Имя ссылки", f"Ссылка {i}")
+        # Запасное имя формируется, только если в строке нет имени ссылки
+        link_name = str(link.get("Имя ссылки") or f"Ссылка {i}")
         # Используем имя ссылки как идентификатор (можно также использовать саму ссылку)
-        callback_data = f"{callback_prefix}:{link_name}"
-        builder.button(text=link_name, callback_data=callback_data)
+        add(make_button(text=link_name, callback_data=f"{callback_prefix}:{link_name}"))
 
     builder.button(text="↩️ Назад", callback_data="back_to_channel_stats")
     builder.adjust(1)
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1)
 def get_back_to_channels_keyboard() -> InlineKeyboardMarkup:
     """Возвращает клавиатуру с кнопкой возврата к выбору каналов"""
     builder = InlineKeyboardBuilder()
@@ -122,6 +170,7 @@ def get_back_to_channels_keyboard() -> InlineKeyboardMarkup:
     return builder.as_markup()
 
 
+@lru_cache(maxsize=1)
 def get_approval_type_keyboard() -> InlineKeyboardMarkup:
     """Возвращает клавиатуру для выбора типа одобрения"""
     builder = InlineKeyboardBuilder()
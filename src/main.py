@@ -6,43 +6,63 @@
 """
 
 import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 
 from aiogram import Bot, Dispatcher, F
 from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ChatMemberStatus, ParseMode
+from aiogram.enums import ParseMode
 from aiogram.filters import Command, CommandStart
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.storage.base import BaseStorage
 from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import CallbackQuery, Message
 
+try:
+    import uvloop  # Быстрый event loop на libuv (нет под Windows)
+except ImportError:
+    uvloop = None
+
 from configs.config import Config
-from handlers.buttons import buttons_router
-from handlers.links import (
+from src.handlers.buttons import buttons_router
+from src.handlers.links import (
     cmd_create_link,
+    cmd_reload_channels,
     handle_approval_type_selected,
+    invite_links_batcher,
     process_link_name,
 )
-from handlers.requests import requests_router
-from handlers.statistics import (
+from src.handlers.requests import requests_router
+from src.handlers.statistics import (
     cmd_statistics,
     handle_channel_selected_for_stats,
     handle_link_selected_for_stats,
 )
-from handlers.subscribers import (
+from src.handlers.subscribers import (
     handle_chat_join_request,
-    handle_new_member,
-    handle_unsubscribed_member,
+    handle_chat_member,
+    join_requests_batcher,
+    subscribers_batcher,
 )
-from keyboards.keyboards import get_main_menu_keyboard
-from states.state import CreateLinkStates
-from utils.backup import GoogleTableBackup
-from utils.GoogleSheets import GoogleSheetsManager
-from utils.logger import get_logger
+from src.keyboards.keyboards import get_main_menu_keyboard
+from src.states.state import CreateLinkStates
+from src.utils.backup import GoogleTableBackup
+from src.utils.chat_titles import warm_chat_titles
+from src.utils.GoogleSheets import GoogleSheetsManager
+from src.utils.logger import get_logger
 
 # === Запускаем логирование ===
 logger = get_logger(__name__)
 
+# Потоки для синхронных вызовов gspread (asyncio.to_thread): ограничены,
+# чтобы всплеск событий не плодил потоки сверх пула соединений к API
+GSHEETS_WORKERS = 4
+
+# Redis для FSM: размер пула соединений и время жизни незавершённых сценариев
+REDIS_MAX_CONNECTIONS = 20
+FSM_TTL = 60 * 60  # 1 час
+
 
 # === Инициализация бота ===
 def init_bot(gsheets: GoogleSheetsManager) -> Bot:
@@ -56,9 +76,26 @@ def init_bot(gsheets: GoogleSheetsManager) -> Bot:
 
 
 # === Инициализация хранилища данных ===
-def init_storage():
-    """Инициализирует FSM хранилище"""
-    return MemoryStorage()
+def init_storage() -> BaseStorage:
+    """
+    Инициализирует FSM хранилище.
+
+    Если задан REDIS_URL — состояния хранятся в Redis (пул соединений,
+    переживают перезапуск и доступны нескольким процессам бота),
+    иначе — в памяти процесса.
+    """
+    if not Config.REDIS_URL:
+        return MemoryStorage()
+
+    from aiogram.fsm.storage.redis import RedisStorage  # Нужен пакет redis
+
+    logger.info("✅ FSM хранилище: Redis")
+    return RedisStorage.from_url(
+        Config.REDIS_URL,
+        connection_kwargs={"max_connections": REDIS_MAX_CONNECTIONS},
+        state_ttl=FSM_TTL,
+        data_ttl=FSM_TTL,
+    )
 
 
 # === Инициализация Google Sheets ===
@@ -78,19 +115,9 @@ def register_chat_member_handlers(
     dp: Dispatcher, bot: Bot, gsheets: GoogleSheetsManager
 ):
     """Регистрирует обработчики событий изменения состава чата"""
-    dp.chat_member.register(
-        partial(handle_new_member, bot=bot, gsheets=gsheets),
-        F.old_chat_member.status.in_([ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]),
-        F.new_chat_member.status == ChatMemberStatus.MEMBER,
-    )
-
-    dp.chat_member.register(
-        partial(handle_unsubscribed_member, bot=bot, gsheets=gsheets),
-        F.old_chat_member.status.in_(
-            [ChatMemberStatus.MEMBER, ChatMemberStatus.RESTRICTED]
-        ),
-        F.new_chat_member.status.in_([ChatMemberStatus.LEFT, ChatMemberStatus.KICKED]),
-    )
+    # Один обработчик на все обновления: тип перехода (вступление/отписка)
+    # определяется по таблице переходов внутри handle_chat_member
+    dp.chat_member.register(partial(handle_chat_member, bot=bot, gsheets=gsheets))
     logger.info("✅ Обработчики участников чата зарегистрированы")
 
 
@@ -105,66 +132,123 @@ def register_chat_join_request_handlers(
     logger.info("✅ Обработчики заявок на вступление зарегистрированы")
 
 
-# === Регистрация команд ===
-def register_command_handlers(dp: Dispatcher):
-    """Регистрирует обработчики текстовых команд"""
+# === Регистрация фоновой пакетной записи в Google Таблицу ===
+def register_sheet_writers(dp: Dispatcher, gsheets: GoogleSheetsManager):
+    """
+    Запускает очереди пакетной записи при старте бота и дописывает
+    оставшиеся в них данные при остановке (хуки startup/shutdown aiogram)
+    """
+    writers = (
+        (invite_links_batcher, gsheets.add_invite_links_batch),
+        (subscribers_batcher, gsheets.add_subscribers_batch),
+        (join_requests_batcher, gsheets.add_join_requests_batch),
+    )
+    tasks: list[asyncio.Task] = []
 
-    @dp.message(CommandStart())
-    async def cmd_start(message: Message):
-        """Обработка команды /start"""
-        try:
-            if message.from_user.id in Config.TELEGRAM_ADMIN_IDS:
-                await message.answer(
-                    "👋 Приветствую, администратор! Выберите действие:",
-                    reply_markup=get_main_menu_keyboard(),
-                )
-            else:
-                await message.answer("⛔ У вас нет доступа к этому боту")
-        except Exception as e:
-            logger.error(f"Ошибка в cmd_start: {e}", exc_info=True)
-            await message.answer("⚠️ Произошла ошибка при обработке команды")
+    async def on_startup():
+        for batcher, flush_func in writers:
+            tasks.append(asyncio.create_task(batcher.run(flush_func)))
 
-    @dp.message(Command("create_link"))
-    async def handle_create_link_command(message: Message, state: FSMContext):
-        await cmd_create_link(message, message.bot, state)
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+        # Ждём, пока задачи завершат начатую запись, и только потом
+        # дописываем то, что осталось в очередях
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for batcher, _ in writers:
+            await batcher.flush()
 
-    @dp.message(CreateLinkStates.waiting_for_link_name)
-    async def handle_link_name_input(message: Message, state: FSMContext):
-        await process_link_name(message, state, message.bot, message.bot.gsheets)
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    logger.info("✅ Пакетная запись в Google Таблицу зарегистрирована")
 
-    @dp.callback_query(
-        F.data.in_(
-            ["approval_required", "approval_not_required", "back_to_channel_selection"]
-        )
+
+# === Обработчики команд ===
+async def cmd_start(message: Message):
+    """Обработка команды /start"""
+    try:
+        if message.from_user.id in Config.TELEGRAM_ADMIN_IDS:
+            await message.answer(
+                "👋 Приветствую, администратор! Выберите действие:",
+                reply_markup=get_main_menu_keyboard(),
+            )
+        else:
+            await message.answer("⛔ У вас нет доступа к этому боту")
+    except Exception as e:
+        logger.error(f"Ошибка в cmd_start: {e}", exc_info=True)
+        await message.answer("⚠️ Произошла ошибка при обработке команды")
+
+
+async def handle_create_link_command(message: Message, state: FSMContext):
+    await cmd_create_link(message, message.bot, state)
+
+
+async def handle_reload_channels_command(message: Message):
+    await cmd_reload_channels(message)
+
+
+async def handle_link_name_input(message: Message, state: FSMContext):
+    await process_link_name(message, state, message.bot)
+
+
+async def handle_approval_selection(callback: CallbackQuery, state: FSMContext):
+    await handle_approval_type_selected(callback, state)
+
+
+# Хэндлеры статистики по подпискам
+async def handle_statistics_button(message: Message, state: FSMContext):
+    await cmd_statistics(message, message.bot, state)
+
+
+async def handle_stats_channel_selection(callback: CallbackQuery, state: FSMContext):
+    await handle_channel_selected_for_stats(
+        callback, state, callback.bot, callback.bot.gsheets
     )
-    async def handle_approval_selection(callback: CallbackQuery, state: FSMContext):
-        await handle_approval_type_selected(callback, state)
 
-    # Хэндлеры статистики по подпискам
-    @dp.message(F.text == "📊 Статистика по подпискам")
-    async def handle_statistics_button(message: Message, state: FSMContext):
-        await cmd_statistics(message, message.bot, state)
-
-    @dp.callback_query(F.data.startswith("stats_channel:"))
-    async def handle_stats_channel_selection(
-        callback: CallbackQuery, state: FSMContext
-    ):
+
+async def handle_stats_navigation(callback: CallbackQuery, state: FSMContext):
+    # "Назад" к списку каналов обрабатывает хэндлер ссылок,
+    # "Назад" в главное меню — хэндлер каналов
+    if callback.data == "back_to_channel_stats":
+        await handle_link_selected_for_stats(callback, state, callback.bot.gsheets)
+    else:
         await handle_channel_selected_for_stats(
             callback, state, callback.bot, callback.bot.gsheets
         )
 
-    @dp.callback_query(F.data.in_(["back_to_main_stats", "back_to_channel_stats"]))
-    async def handle_stats_navigation(callback: CallbackQuery, state: FSMContext):
-        if callback.data == "back_to_channel_stats":
-            await handle_channel_selected_for_stats(
-                callback, state, callback.bot, callback.bot.gsheets
-            )
-        else:
-            await handle_link_selected_for_stats(callback, state, callback.bot.gsheets)
 
-    @dp.callback_query(F.data.startswith("stats_link:"))
-    async def handle_stats_link_selection(callback: CallbackQuery, state: FSMContext):
-        await handle_link_selected_for_stats(callback, state, callback.bot.gsheets)
+async def handle_stats_link_selection(callback: CallbackQuery, state: FSMContext):
+    await handle_link_selected_for_stats(callback, state, callback.bot.gsheets)
+
+
+# === Регистрация команд ===
+def register_command_handlers(dp: Dispatcher):
+    """Регистрирует обработчики текстовых команд"""
+    dp.message.register(cmd_start, CommandStart())
+    dp.message.register(handle_create_link_command, Command("create_link"))
+    dp.message.register(handle_reload_channels_command, Command("reload_channels"))
+    dp.message.register(handle_link_name_input, CreateLinkStates.waiting_for_link_name)
+    dp.callback_query.register(
+        handle_approval_selection,
+        F.data.in_(
+            ["approval_required", "approval_not_required", "back_to_channel_selection"]
+        ),
+    )
+
+    # Хэндлеры статистики по подпискам
+    dp.message.register(
+        handle_statistics_button, F.text == "📊 Статистика по подпискам"
+    )
+    dp.callback_query.register(
+        handle_stats_channel_selection, F.data.startswith("stats_channel:")
+    )
+    dp.callback_query.register(
+        handle_stats_navigation,
+        F.data.in_(["back_to_main_stats", "back_to_channel_stats"]),
+    )
+    dp.callback_query.register(
+        handle_stats_link_selection, F.data.startswith("stats_link:")
+    )
 
     logger.info("✅ Команды зарегистрированы")
 
@@ -209,19 +293,47 @@ if __name__ == "__main__":
         dp, bot, gsheets
     )  # Добавляем регистрацию обработчиков заявок
     register_command_handlers(dp)
+    register_sheet_writers(dp, gsheets)
 
     # === Запуск бота и фоновой задачи ===
     async def main():
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(
+                max_workers=GSHEETS_WORKERS, thread_name_prefix="gsheets"
+            )
+        )
+
         # Создаем и запускаем фоновую задачу
-        backup_handler = GoogleTableBackup(bot=bot)
+        backup_handler = GoogleTableBackup(bot=bot, gsheets=gsheets)
         backup_task = asyncio.create_task(backup_handler.run_backup_loop())
 
+        # Названия каналов загружаем заранее, чтобы первые нажатия в меню
+        # не ждали запросов get_chat
+        await warm_chat_titles(bot)
+
         try:
             logger.info("🤖 Бот готов к работе!")
             await run_bot(bot, dp)
         finally:
             backup_task.cancel()
-            await backup_task  # Ждём завершения задачи
+            # run_backup_loop перехватывает только Exception — отмену гасим здесь,
+            # иначе закрытие соединений ниже не выполнится
+            with contextlib.suppress(asyncio.CancelledError):
+                await backup_task  # Ждём завершения задачи
+            try:
+                gsheets.close()
+            except Exception as e:
+                logger.error(
+                    f"Ошибка при закрытии сессии Google API: {e}", exc_info=True
+                )
+            # Закрываем пул соединений Redis (для MemoryStorage — ничего не делает)
+            try:
+                await storage.close()
+            except Exception as e:
+                logger.error(f"Ошибка при закрытии хранилища FSM: {e}", exc_info=True)
             await bot.session.close()
 
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
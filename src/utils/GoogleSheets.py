@@ -6,36 +6,299 @@
 добавление пользователей и пригласительных ссылок, обновление данных и пр.
 """
 
+import functools
+import random
+import re
+import threading
 import time
-import traceback
-from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 import gspread
+import orjson
+from google.auth.transport.requests import AuthorizedSession
 from gspread.exceptions import APIError, WorksheetNotFound
+from gspread.utils import absolute_range_name, convert_credentials, rowcol_to_a1
 from oauth2client.service_account import ServiceAccountCredentials
+from requests import Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import ConnectTimeout
+from requests.exceptions import Timeout as RequestsTimeout
 from tenacity import (
+    Retrying,
     retry,
-    retry_if_exception_type,
+    retry_if_exception,
     stop_after_attempt,
     wait_exponential,
 )
+from urllib3.exceptions import NewConnectionError
 
 from configs.config import HEADERS, Config
-from utils.logger import get_logger
+from src.utils.logger import get_logger
 
 # === Запускаем логирование ===
 logger = get_logger(__name__)
 
 # Константы
-MAX_RETRIES = 5
-API_DELAY = 1.5
+MAX_RETRIES = 3  # Попыток запроса к API при временной ошибке
+API_DELAY = 1.5  # Средний интервал между запросами к API (в секундах)
+# Запас запросов, которые можно отправить подряд без ожидания. За любую минуту
+# уходит не больше API_BURST + 60 / API_DELAY = 60 запросов — квота Sheets API
+API_BURST = 20
+# Пауза после ответа 429, если API не прислал заголовок Retry-After (в секундах)
+RATE_LIMIT_PAUSE = 10.0
+# Коды ответа API, после которых запрос имеет смысл повторить
+RETRYABLE_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Сглаживание оценки перегрузки API (доля ответов 429 среди последних запросов)
+CONGESTION_SMOOTHING = 0.2
+
+# Пул HTTPS-соединений к Google API (одно keep-alive соединение переиспользуется
+# между запросами вместо нового TLS-рукопожатия на каждый вызов)
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+# Время жизни списка активных пригласительных ссылок (в секундах)
+ACTIVE_LINKS_TTL = 60
+# Как часто deep_health_check действительно обращается к API (в секундах)
+HEALTH_CHECK_TTL = 30
+
+
+class _TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты запросов (token bucket).
+
+    Запас пополняется на один запрос каждые `interval` секунд и копится
+    до `burst` запросов, которые можно отправить подряд без ожидания.
+    """
+
+    def __init__(self, interval: float, burst: int):
+        self.interval = interval
+        self.burst = burst
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._ts = time.monotonic()
+
+    def acquire(self) -> None:
+        """Забирает один запрос из запаса, при необходимости дожидаясь его"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._ts) / self.interval
+            )
+            self._ts = now
+
+            # Запрос забирается сразу, даже в долг: следующие потоки увидят
+            # отрицательный запас и встанут в очередь за этим
+            self._tokens -= 1
+            wait = -self._tokens * self.interval
+
+        # Ждём вне блокировки, чтобы другие потоки тем временем заняли свою очередь
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Обнуляет запас так, чтобы следующий запрос ушёл не раньше чем через `seconds`"""
+        with self._lock:
+            self._tokens = 1 - seconds / self.interval
+            self._ts = time.monotonic()
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Возвращает задержку из заголовка Retry-After ответа API (если он есть)"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _is_transient(error: BaseException) -> bool:
+    """
+    Временная ли ошибка: квота (429), сбой на стороне Google (5xx)
+    или обрыв соединения. Остальные ошибки (нет файла ключа, нет доступа,
+    ошибка в коде) повторять бессмысленно.
+    """
+    if isinstance(error, APIError):
+        return error.response.status_code in RETRYABLE_STATUSES
+    return isinstance(error, (RequestsConnectionError, RequestsTimeout))
+
+
+def _is_rate_limited(error: BaseException) -> bool:
+    """Отклонён ли запрос квотой (429) — такой запрос Google не выполнял"""
+    return isinstance(error, APIError) and error.response.status_code == 429
+
+
+def _is_unsent(error: BaseException) -> bool:
+    """
+    Не удалось установить соединение (таймаут подключения, отказ, DNS) —
+    запрос до Google не дошёл. Обрыв или таймаут уже после отправки сюда
+    не относятся.
+    """
+    if isinstance(error, ConnectTimeout):
+        return True
+    if isinstance(error, RequestsConnectionError) and error.args:
+        return isinstance(getattr(error.args[0], "reason", None), NewConnectionError)
+    return False
+
+
+def _is_safe_to_resend(error: BaseException) -> bool:
+    """
+    Можно ли повторить запись: только если запрос точно не применён.
+    После 5xx или таймаута ответа Google мог уже выполнить batchUpdate,
+    и повтор продублирует строки или удалит чужие.
+    """
+    return _is_rate_limited(error) or _is_unsent(error)
+
+
+_exponential_wait = wait_exponential(multiplier=1, min=2, max=10)
+
+
+def _wait_retry_after(retry_state) -> float:
+    """
+    Ожидание перед повтором: сколько просит API (Retry-After) или экспоненциально.
+
+    Экспоненциальная задержка растёт с оценкой перегрузки API (доля ответов 429)
+    и получает случайную добавку до 50%, чтобы повторы из нескольких потоков
+    не приходили одновременно.
+    """
+    delay = _retry_after(retry_state.outcome.exception())
+    if delay is None:
+        manager = retry_state.args[0] if retry_state.args else None
+        congestion = getattr(manager, "_congestion", 0.0)
+        delay = _exponential_wait(retry_state) * (1 + congestion)
+    return delay + random.uniform(0, 0.5 * delay)
+
+
+# Повтор временных ошибок чтения. Это единственный уровень повторов:
+# HTTP-адаптер сессии запросы сам не повторяет
+_retry_transient = retry(
+    stop=stop_after_attempt(MAX_RETRIES),
+    wait=_wait_retry_after,
+    retry=retry_if_exception(_is_transient),
+    before_sleep=lambda _: logger.warning("Повторная попытка после ошибки API"),
+    reraise=True,
+)
+
+# Повтор записи: запись не идемпотентна, поэтому повторяется только отказ,
+# после которого Google точно ничего не изменил
+_WRITE_RETRY = dict(
+    stop=stop_after_attempt(MAX_RETRIES),
+    wait=_wait_retry_after,
+    retry=retry_if_exception(_is_safe_to_resend),
+    before_sleep=lambda _: logger.warning(
+        "Повторная попытка записи: запрос не применён"
+    ),
+    reraise=True,
+)
+_retry_write = retry(**_WRITE_RETRY)
+
+
+class _OrjsonResponse(Response):
+    """Ответ API, тело которого разбирается через orjson"""
+
+    def json(self, **kwargs):
+        return orjson.loads(self.content)
+
+
+class _OrjsonSession(AuthorizedSession):
+    """
+    Авторизованная сессия, которая кодирует и разбирает JSON через orjson.
+
+    Тела batchUpdate с сотнями строк кодируются в байты напрямую,
+    без промежуточной строки модуля json, а ответы чтения с тысячами строк
+    разбираются из байтов ответа.
+    """
+
+    def request(self, method, url, data=None, headers=None, json=None, **kwargs):
+        if json is not None and data is None:
+            data = orjson.dumps(json)
+            headers = {**(headers or {}), "Content-Type": "application/json"}
+            json = None
+        response = super().request(
+            method, url, data=data, headers=headers, json=json, **kwargs
+        )
+        # gspread вызывает response.json() — подменяем разбор на orjson
+        response.__class__ = _OrjsonResponse
+        return response
+
+
+@functools.lru_cache(maxsize=1)
+def _load_credentials(path: str, scope: Tuple[str, ...]) -> ServiceAccountCredentials:
+    """
+    Читает ключ сервисного аккаунта. Результат кэшируется: повторные попытки
+    подключения не разбирают JSON и RSA-ключ заново.
+    """
+    return ServiceAccountCredentials.from_json_keyfile_name(path, list(scope))
+
+
+def _build_session(credentials) -> AuthorizedSession:
+    """
+    Создаёт авторизованную HTTP-сессию с пулом соединений.
+
+    Адаптер запросы не повторяет: повторы делают `_retry_transient` (чтение)
+    и `_retry_write` (запись) с учётом Retry-After и общего лимита запросов.
+    """
+    session = _OrjsonSession(convert_credentials(credentials))
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, max_retries=0
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+def _contiguous_runs(indices: List[int]) -> List[Tuple[int, int]]:
+    """
+    Объединяет возрастающие номера строк в непрерывные диапазоны:
+    [2, 3, 4, 7] → [(2, 4), (7, 7)] (границы включительно)
+    """
+    runs: List[List[int]] = []
+    for index in indices:
+        if runs and runs[-1][1] + 1 == index:
+            runs[-1][1] = index
+        else:
+            runs.append([index, index])
+    return [(first, last) for first, last in runs]
+
+
+# Начало ссылки: полный адрес t.me (группа 1) либо необязательный "+"
+_LINK_PREFIX_RE = re.compile(r"(https://t\.me/)|\+?")
+
+
+def _normalize_invite_link(link: str) -> str:
+    """Дополняет короткую ссылку ("abc", "+abc") до вида https://t.me/+abc"""
+    link = link.strip()
+    if not link:
+        return link
+    match = _LINK_PREFIX_RE.match(link)
+    if match.group(1):
+        return link
+    return "https://t.me/+" + link[match.end() :]
+
 
 # Названия листов
 MAIN_SHEET_NAME = "Подписчики"
 INVITE_LINKS_SHEET_NAME = "Пригласительные ссылки"
 JOIN_REQUESTS_SHEET_NAME = "Заявки на вступление"
 
+# Заголовки листа заявок (стандартные заголовки + данные канала)
+JOIN_REQUESTS_HEADERS = [*HEADERS, "channel_id", "channel_name"]
+
+# Заголовки листа пригласительных ссылок
+INVITE_LINKS_HEADERS = [
+    "Имя ссылки",
+    "Ссылка",
+    "Имя канала",
+    "Дата создания ссылки",
+]
+
+# Заголовки каждого листа, в который пишутся строки
+SHEET_HEADERS = {
+    MAIN_SHEET_NAME: HEADERS,
+    JOIN_REQUESTS_SHEET_NAME: JOIN_REQUESTS_HEADERS,
+    INVITE_LINKS_SHEET_NAME: INVITE_LINKS_HEADERS,
+}
+
 
 class GoogleSheetsManager:
     """
@@ -49,40 +312,98 @@ class GoogleSheetsManager:
             "https://www.googleapis.com/auth/drive",
         ]
         self.creds_path = Config.GOOGLE_CREDS_JSON
+        # Без файла ключа подключение не удастся ни с какой попытки
+        if not self.creds_path.exists():
+            raise FileNotFoundError(f"Файл учетных данных не найден: {self.creds_path}")
         self.client = None
+        self.spreadsheet = None  # Объект таблицы (открывается один раз в _connect)
         self.sheet = None  # Главный лист
-        self.last_api_call = datetime.min
+        # Квоты Sheets API на чтение и на запись считаются раздельно
+        self._read_bucket = _TokenBucket(API_DELAY, API_BURST)
+        self._write_bucket = _TokenBucket(API_DELAY, API_BURST)
+        # Оценка перегрузки API: растёт с каждым ответом 429, убывает с успехами
+        self._congestion = 0.0
+        # Проверенные в этом процессе заголовки: id листа → заголовки
+        self._headers_checked: Dict[int, Tuple[str, ...]] = {}
+        # Объекты листов по названию: метаданные таблицы запрашиваются один раз
+        self._sheets_cache: Dict[str, gspread.Worksheet] = {}
+        # Активные ссылки: (время чтения по time.monotonic, список ссылок)
+        self._active_links_cache: Optional[Tuple[float, List[Dict]]] = None
+        # Индекс листа ссылок: (время чтения, заголовки, ссылка → номер строки)
+        self._link_index: Optional[Tuple[float, List[str], Dict[str, int]]] = None
+        self._last_healthy = float("-inf")  # Последняя успешная проверка через API
         self._connect()
 
-    def _wait_for_api_limit(self):
+    def _wait_for_api_limit(self, write: bool = True):
         """Ограничивает частоту вызова API для избежания рейт-лимитов"""
-        elapsed = (datetime.now() - self.last_api_call).total_seconds()
-        if elapsed < API_DELAY:
-            time.sleep(API_DELAY - elapsed)
-        self.last_api_call = datetime.now()
-
-    @retry(
-        stop=stop_after_attempt(MAX_RETRIES),
-        wait=wait_exponential(multiplier=1, min=2, max=10),
-        retry=retry_if_exception_type((APIError, Exception)),
-        before_sleep=lambda _: logger.warning("Повторная попытка после ошибки API"),
-    )
+        (self._write_bucket if write else self._read_bucket).acquire()
+
+    def _update_congestion(self, rate_limited: bool) -> None:
+        """Обновляет скользящую оценку доли ответов 429"""
+        self._congestion += CONGESTION_SMOOTHING * (
+            float(rate_limited) - self._congestion
+        )
+
+    def _pause_on_rate_limit(self, error: Exception, write: bool = True) -> None:
+        """
+        После ответа 429 приостанавливает запросы того же вида (чтение или запись)
+        на время из Retry-After.
+        """
+        response = getattr(error, "response", None)
+        if getattr(response, "status_code", None) != 429:
+            return
+        self._update_congestion(True)
+        delay = _retry_after(error) or RATE_LIMIT_PAUSE * (1 + self._congestion)
+        logger.warning(
+            "Превышена квота %s Sheets API, пауза %.1f с",
+            "записи" if write else "чтения",
+            delay,
+        )
+        (self._write_bucket if write else self._read_bucket).pause(delay)
+
+    def _request(self, func, *args, write: bool = False, **kwargs):
+        """
+        Выполняет вызов API с учётом лимита запросов.
+        Каждый успешный ответ — и на чтение, и на запись — снижает оценку
+        перегрузки, ответ 429 повышает её и приостанавливает запросы.
+        """
+        self._wait_for_api_limit(write=write)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self._pause_on_rate_limit(e, write=write)
+            raise
+        self._update_congestion(False)
+        return result
+
+    @_retry_transient
+    def _read(self, func, *args, **kwargs):
+        """Чтение из API с повтором временных ошибок"""
+        return self._request(func, *args, **kwargs)
+
+    @_retry_write
+    def _write(self, func, *args, **kwargs):
+        """
+        Запись в API с повтором, только если запрос не применён: отказ
+        по квоте (429, повтор не раньше Retry-After) или соединение
+        не установлено. Остальные ошибки не повторяются.
+        """
+        return self._request(func, *args, write=True, **kwargs)
+
+    @_retry_transient
     def _connect(self):
         """Подключение к Google Таблице"""
         try:
-            self._wait_for_api_limit()
+            self._wait_for_api_limit(write=False)
             logger.info("Подключение к Google Sheets API...")
 
-            if not self.creds_path.exists():
-                raise FileNotFoundError(
-                    f"Файл учетных данных не найден: {self.creds_path}"
-                )
-
-            credentials = ServiceAccountCredentials.from_json_keyfile_name(
-                str(self.creds_path), self.scope
+            credentials = _load_credentials(str(self.creds_path), tuple(self.scope))
+            self.client = gspread.authorize(
+                credentials, session=_build_session(credentials)
+            )
+            spreadsheet = self.spreadsheet = self.client.open_by_key(
+                Config.SPREADSHEET_ID
             )
-            self.client = gspread.authorize(credentials)
-            spreadsheet = self.client.open_by_key(Config.SPREADSHEET_ID)
 
             # Получаем или создаем главный лист с правильным названием
             try:
@@ -93,77 +414,132 @@ class GoogleSheetsManager:
                 try:
                     self.sheet.update_title(MAIN_SHEET_NAME)
                 except Exception as e:
-                    logger.warning(f"Не удалось переименовать первый лист: {e}")
+                    logger.warning("Не удалось переименовать первый лист: %s", e)
 
+            self._sheets_cache[MAIN_SHEET_NAME] = self.sheet
             logger.info("Успешное подключение к Google Таблице")
 
         except Exception as e:
-            logger.error(f"Ошибка подключения: {e}\n{traceback.format_exc()}")
+            logger.error("Ошибка подключения: %s", e, exc_info=True)
             raise
 
-    def _safe_append_row(self, sheet, row: List[str]) -> bool:
-        """Добавляет строку с защитой от ошибок и ограничений API"""
+    def close(self) -> None:
+        """Закрывает HTTP-сессию клиента (вызывается при остановке бота)"""
+        if self.client is not None:
+            self.client.http_client.session.close()
+
+    def append_rows_multi(self, items: List[Tuple[str, List[str]]]) -> bool:
+        """
+        Добавляет строки сразу в несколько листов одним запросом batchUpdate.
+
+        :param items: пары (название листа, строка) в порядке поступления;
+            для каждого листа формируется один запрос appendCells
+        """
         try:
-            self._wait_for_api_limit()
-            sheet.append_row(row)
-            logger.debug(f"Добавлена строка: {row}")
+            rows_by_sheet: Dict[str, List[List[str]]] = {}
+            for title, row in items:
+                rows_by_sheet.setdefault(title, []).append(row)
+
+            spreadsheet = None
+            requests = []
+            for title, rows in rows_by_sheet.items():
+                sheet = self._get_sheet(title)
+                self.ensure_headers(SHEET_HEADERS[title], title)
+                spreadsheet = sheet.spreadsheet
+                requests.append(
+                    {
+                        "appendCells": {
+                            "sheetId": sheet.id,
+                            "rows": [
+                                {
+                                    "values": [
+                                        {"userEnteredValue": {"stringValue": str(v)}}
+                                        for v in row
+                                    ]
+                                }
+                                for row in rows
+                            ],
+                            "fields": "userEnteredValue",
+                        }
+                    }
+                )
+
+            if not requests:
+                return True
+
+            self._write(spreadsheet.batch_update, {"requests": requests})
+            if INVITE_LINKS_SHEET_NAME in rows_by_sheet:
+                self._active_links_cache = None
+                self._link_index = None
+            logger.info(
+                "Строки добавлены: %s",
+                {title: len(rows) for title, rows in rows_by_sheet.items()},
+            )
             return True
         except Exception as e:
-            logger.error(f"Ошибка при добавлении строки: {str(e)}")
+            logger.error("Ошибка при добавлении строк: %s", e, exc_info=True)
+            # Лист могли удалить или переименовать вручную — при следующей
+            # записи листы и заголовки будут получены заново
+            self._sheets_cache.clear()
+            self._headers_checked.clear()
+            self._active_links_cache = None
+            self._link_index = None
             return False
 
-    def ensure_headers(self, headers: List[str], sheet_title: str = None) -> None:
+    def ensure_headers(self, headers: Sequence[str], sheet_title: str = None) -> None:
         """
         Проверяет наличие заголовков в указанном листе.
-        Если их нет или они не совпадают — создаёт/обновляет.
+        Если их нет или они не совпадают — перезаписывает первую строку.
+
+        Читается только первая строка листа, а не весь лист; после успешной
+        проверки заголовки запоминаются по id листа, и повторные вызовы
+        с теми же заголовками не обращаются к API.
         """
         try:
             sheet = self._get_sheet(sheet_title) if sheet_title else self.sheet
-            all_values = sheet.get_all_values()
-
-            if not all_values or not all_values[0]:
-                # Если нет данных или заголовков, создаем заголовки
-                sheet.insert_row(headers, index=1)
-                logger.info(f"Заголовки созданы на листе '{sheet.title}'")
-            elif all_values[0] != headers:
-                # Если заголовки не совпадают, обновляем их
-                sheet.delete_rows(1)
-                sheet.insert_row(headers, index=1)
-                logger.warning(f"Заголовки обновлены на листе '{sheet.title}'")
+            expected = tuple(headers)
+            if self._headers_checked.get(sheet.id) == expected:
+                return
+
+            headers = list(expected)  # Строка листа приходит списком
+            current = self._read(sheet.row_values, 1)
+
+            if current != headers:
+                # Перезаписываем первую строку на месте (один запрос вместо
+                # delete_rows + insert_row); лишние старые ячейки очищаем
+                row = headers + [""] * (len(current) - len(headers))
+                self._write(sheet.update, [row], "1:1", value_input_option="RAW")
+                if current:
+                    logger.warning("Заголовки обновлены на листе '%s'", sheet.title)
+                else:
+                    logger.info("Заголовки созданы на листе '%s'", sheet.title)
             else:
-                logger.debug(f"Заголовки актуальны на листе '{sheet.title}'")
+                logger.debug("Заголовки актуальны на листе '%s'", sheet.title)
+
+            self._headers_checked[sheet.id] = expected
         except Exception as e:
             logger.error(
-                f"Ошибка при проверке заголовков на листе '{sheet_title}': {e}\n{traceback.format_exc()}"
+                "Ошибка при проверке заголовков на листе '%s': %s",
+                sheet_title,
+                e,
+                exc_info=True,
             )
 
     def add_join_request(self, request_data: Dict) -> bool:
         """
         Добавляет новую заявку на вступление в отдельный лист "Заявки на вступление"
         """
-        try:
-            # Получаем или создаем лист для заявок
-            sheet = self._get_sheet(JOIN_REQUESTS_SHEET_NAME)
-
-            # Заголовки для листа заявок (расширяем стандартные заголовки)
-            request_headers = list(HEADERS) + ["channel_id", "channel_name"]
-            self.ensure_headers(request_headers, JOIN_REQUESTS_SHEET_NAME)
-
-            # Формируем строку данных
-            row = [str(request_data.get(h, "")) for h in request_headers]
-
-            if not self._safe_append_row(sheet, row):
-                raise ValueError("Не удалось добавить строку заявки")
-
-            user_id = request_data.get("id", "Unknown")
-            channel_name = request_data.get("Название канала", "Unknown")
+        row = [str(request_data.get(h, "")) for h in JOIN_REQUESTS_HEADERS]
+        return self.add_join_requests_batch([row])
 
-            logger.info(f"Заявка добавлена в таблицу: {user_id} в канал {channel_name}")
-            return True
+    def add_join_requests_batch(self, rows: List[List[str]]) -> bool:
+        """
+        Добавляет пакет заявок на вступление в лист "Заявки на вступление"
+        одним запросом к API.
 
-        except Exception as e:
-            logger.error(f"Ошибка при добавлении заявки: {e}\n{traceback.format_exc()}")
-            return False
+        :param rows: готовые строки в порядке JOIN_REQUESTS_HEADERS
+        """
+        return self.append_rows_multi([(JOIN_REQUESTS_SHEET_NAME, r) for r in rows])
 
     def get_pending_requests(self, channel_id: str) -> List[Dict]:
         """
@@ -171,73 +547,112 @@ class GoogleSheetsManager:
         """
         try:
             sheet = self._get_sheet(JOIN_REQUESTS_SHEET_NAME)
-            all_values = sheet.get_all_values()
 
-            if not all_values or len(all_values) <= 1:  # Только заголовки или пусто
+            # Сначала читаем только столбец channel_id, чтобы найти номера строк
+            headers, channel_ids = self._read_column(
+                sheet, JOIN_REQUESTS_HEADERS, "channel_id"
+            )
+            if not headers:  # Пустой лист
                 return []
 
-            headers = all_values[0]
-
-            # Проверяем наличие необходимых колонок
-            if "channel_id" not in headers:
+            if channel_ids is None:
                 logger.error("Колонка channel_id не найдена в листе заявок")
                 return []
 
-            channel_id_index = headers.index("channel_id")
-            requests_list = []
+            # Номера строк листа (1-based, строка 1 — заголовки)
+            matches = [
+                row_number
+                for row_number, value in enumerate(channel_ids, 2)
+                if value == channel_id
+            ]
+            if not matches:
+                return []
 
-            # Проходим по всем строкам и фильтруем по channel_id
-            for row in all_values[1:]:  # Пропускаем заголовки
-                if len(row) > channel_id_index and row[channel_id_index] == channel_id:
-                    requests_list.append(dict(zip(headers, row)))
+            # Затем одним запросом batchGet забираем только найденные строки
+            # (соседние строки — одним диапазоном)
+            ranges = self._read(
+                sheet.batch_get,
+                [f"{first}:{last}" for first, last in _contiguous_runs(matches)],
+            )
+            width = len(headers)
+            requests_list = [
+                dict(zip(headers, row + [""] * (width - len(row))))
+                for value_range in ranges
+                for row in value_range
+            ]
 
             return requests_list
 
         except Exception as e:
-            logger.error(f"Ошибка при получении заявок: {e}\n{traceback.format_exc()}")
+            logger.error("Ошибка при получении заявок: %s", e, exc_info=True)
             return []
 
     def move_requests_to_main_sheet(self, request_ids: List[str]) -> bool:
         """
         Переносит обработанные заявки из листа "Заявки на вступление" в основной лист
-        и удаляет их из листа заявок
+        и удаляет их из листа заявок.
+
+        Принимает сразу все ID пакета: строки удаляются одним запросом batchUpdate.
         """
         try:
             # Получаем листы
             requests_sheet = self._get_sheet(JOIN_REQUESTS_SHEET_NAME)
+            ids_to_delete = set(request_ids)
+
+            # Удаление идёт по номерам строк, поэтому перед каждой попыткой
+            # столбец id перечитывается и диапазоны строятся заново
+            for attempt in Retrying(**_WRITE_RETRY):
+                # Читаем только заголовки и столбец id, а не весь лист
+                headers, ids = self._read_column(
+                    requests_sheet, JOIN_REQUESTS_HEADERS, "id"
+                )
+                if not headers:
+                    return True
 
-            all_requests_values = requests_sheet.get_all_values()
-            if not all_requests_values or len(all_requests_values) <= 1:
-                return True
-
-            headers = all_requests_values[0]
-
-            if "id" not in headers:
-                logger.error("Колонка id не найдена в листе заявок")
-                return False
-
-            id_index = headers.index("id")
-
-            # Находим строки для удаления
-            rows_to_delete = []
-
-            for i, row in enumerate(all_requests_values[1:], 1):  # Пропускаем заголовки
-                if len(row) > id_index and row[id_index] in request_ids:
-                    rows_to_delete.append(
-                        i + 1
-                    )  # +1 потому что get_all_values не включает заголовки, но delete_rows использует 1-based индекс
+                if ids is None:
+                    logger.error("Колонка id не найдена в листе заявок")
+                    return False
 
-            # Удаляем строки из листа заявок (удаляем с конца, чтобы не сбить индексы)
-            for row_index in sorted(rows_to_delete, reverse=True):
-                try:
-                    requests_sheet.delete_rows(row_index)
-                except Exception as e:
-                    logger.error(f"Ошибка при удалении строки {row_index}: {e}")
+                # Находим строки для удаления (0-based индексы строк листа, заголовок — 0)
+                rows_to_delete = [
+                    i for i, value in enumerate(ids, 1) if value in ids_to_delete
+                ]
+                if not rows_to_delete:
+                    return True
+
+                # Удаляем все строки одним запросом batchUpdate. Запросы внутри пакета
+                # применяются по порядку, поэтому удаляем с конца, чтобы не сбить индексы
+                body = {
+                    "requests": [
+                        {
+                            "deleteDimension": {
+                                "range": {
+                                    "sheetId": requests_sheet.id,
+                                    "dimension": "ROWS",
+                                    "startIndex": first,
+                                    "endIndex": last + 1,
+                                }
+                            }
+                        }
+                        # Соседние строки удаляются одним диапазоном
+                        for first, last in reversed(_contiguous_runs(rows_to_delete))
+                    ]
+                }
+                with attempt:
+                    self._request(
+                        requests_sheet.spreadsheet.batch_update, body, write=True
+                    )
+
+            logger.info(
+                "Удалено заявок из листа '%s': %d",
+                JOIN_REQUESTS_SHEET_NAME,
+                len(rows_to_delete),
+            )
 
             return True
 
         except Exception as e:
-            logger.error(f"Ошибка при переносе заявок: {e}\n{traceback.format_exc()}")
+            logger.error("Ошибка при переносе заявок: %s", e, exc_info=True)
             return False
 
     def add_subscriber(self, user_data: Dict) -> bool:
@@ -246,54 +661,50 @@ class GoogleSheetsManager:
         Проверяет и создает заголовки при необходимости.
         :param user_data: данные пользователя, соответствующие HEADERS
         """
-        try:
-            if not self.sheet:
-                logger.error("Таблица не подключена!")
-                return False
+        row = [str(user_data.get(h, "")) for h in HEADERS]
+        return self.add_subscribers_batch([row])
 
-            # Проверяем и создаем заголовки, если нужно
-            self.ensure_headers(HEADERS, MAIN_SHEET_NAME)
-
-            # Формируем строку данных в соответствии с HEADERS
-            row = [str(user_data.get(h, "")) for h in HEADERS]
-            logger.info(f"Готовим к добавлению строку: {row}")
-
-            if not self._safe_append_row(self.sheet, row):
-                raise ValueError("Не удалось добавить строку")
+    def add_subscribers_batch(self, rows: List[List[str]]) -> bool:
+        """
+        Добавляет пакет записей о подписках/отписках в основной лист
+        одним запросом к API.
 
-            return True
-        except Exception as e:
-            logger.error(
-                f"Ошибка при добавлении пользователя: {e}\n{traceback.format_exc()}"
-            )
-            return False
+        :param rows: готовые строки в порядке HEADERS
+        """
+        return self.append_rows_multi([(MAIN_SHEET_NAME, r) for r in rows])
 
     def add_invite_link(self, link_data: Dict) -> bool:
         """Добавляет информацию о пригласительной ссылке в отдельный лист"""
-        try:
-            sheet = self._get_sheet(INVITE_LINKS_SHEET_NAME)
-            headers = [
-                "Имя ссылки",
-                "Ссылка",
-                "Имя канала",
-                "Дата создания ссылки",
-            ]
-            self.ensure_headers(headers, INVITE_LINKS_SHEET_NAME)
-            row = [str(link_data.get(h, "")) for h in headers]
+        return self.add_invite_links_batch([link_data])
 
-            if not self._safe_append_row(sheet, row):
-                raise ValueError("Не удалось добавить строку ссылки")
-
-            logger.info(f"Ссылка добавлена: {row}")
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка при добавлении ссылки: {e}\n{traceback.format_exc()}")
-            return False
+    def add_invite_links_batch(self, links_data: List[Dict]) -> bool:
+        """
+        Добавляет пакет пригласительных ссылок в отдельный лист
+        одним запросом к API
+        """
+        return self.append_rows_multi(
+            [
+                (
+                    INVITE_LINKS_SHEET_NAME,
+                    [str(link_data.get(h, "")) for h in INVITE_LINKS_HEADERS],
+                )
+                for link_data in links_data
+            ]
+        )
 
     def get_active_invite_links(self) -> List[Dict]:
+        """
+        Возвращает неотозванные пригласительные ссылки.
+        Лист меняется редко, поэтому результат кэшируется на ACTIVE_LINKS_TTL
+        секунд и сбрасывается при записи новых ссылок этим процессом.
+        """
+        cached = self._active_links_cache
+        if cached is not None and time.monotonic() - cached[0] < ACTIVE_LINKS_TTL:
+            return list(cached[1])
+
         try:
             sheet = self._get_sheet(INVITE_LINKS_SHEET_NAME)
-            all_values = sheet.get_all_values()
+            all_values = self._read(sheet.get_all_values)
 
             if not all_values or len(all_values) <= 1:
                 return []
@@ -317,16 +728,17 @@ class GoogleSheetsManager:
                                 "clean_link": link.split("/")[-1],
                             }
                         )
-            return active_links
+            self._active_links_cache = (time.monotonic(), active_links)
+            return list(active_links)
         except Exception as e:
-            logger.error(f"Ошибка при получении ссылок: {e}")
+            logger.error("Ошибка при получении ссылок: %s", e)
             return []
 
     def get_invite_links_for_channel(self, channel_name: str) -> List[Dict]:
         """Получает все ссылки для конкретного канала"""
         try:
             sheet = self._get_sheet(INVITE_LINKS_SHEET_NAME)
-            all_values = sheet.get_all_values()
+            all_values = self._read(sheet.get_all_values)
 
             if not all_values or len(all_values) <= 1:
                 return []
@@ -343,14 +755,16 @@ class GoogleSheetsManager:
 
             return channel_links
         except Exception as e:
-            logger.error(f"Ошибка при получении ссылок для канала {channel_name}: {e}")
+            logger.error(
+                "Ошибка при получении ссылок для канала %s: %s", channel_name, e
+            )
             return []
 
     def get_subscribers_for_link(self, link_identifier: str) -> List[Dict]:
         """Получает подписчиков по ссылке или её имени"""
         try:
             sheet = self._get_sheet(MAIN_SHEET_NAME)
-            all_values = sheet.get_all_values()
+            all_values = self._read(sheet.get_all_values)
 
             if not all_values or len(all_values) <= 1:
                 return []
@@ -371,7 +785,7 @@ class GoogleSheetsManager:
             return subscribers
         except Exception as e:
             logger.error(
-                f"Ошибка при получении подписчиков для ссылки {link_identifier}: {e}"
+                "Ошибка при получении подписчиков для ссылки %s: %s", link_identifier, e
             )
             return []
 
@@ -379,78 +793,144 @@ class GoogleSheetsManager:
         """Находит строку в таблице по ссылке"""
         try:
             sheet = self._get_sheet(INVITE_LINKS_SHEET_NAME)
-            all_values = sheet.get_all_values()
-
-            if not all_values or len(all_values) <= 1:
-                return None
+            normalized_link = _normalize_invite_link(link)
+
+            # Вторая попытка — если строка по индексу уже не та (лист правили вручную)
+            for _ in range(2):
+                index = self._get_link_index(sheet)
+                if index is None:
+                    return None
+                headers, rows = index
+
+                row_number = rows.get(normalized_link)
+                if row_number is None:
+                    return None
+
+                # Полную строку запрашиваем только для найденной ссылки
+                row = dict(zip(headers, self._read(sheet.row_values, row_number)))
+                if str(row.get("Ссылка", "")).strip() == normalized_link:
+                    return row
+                self._link_index = None
+            return None
+        except Exception as e:
+            logger.error("Ошибка при поиске строки: %s", e)
+            return None
 
-            headers = all_values[0]
+    def _get_link_index(self, sheet) -> Optional[Tuple[List[str], Dict[str, int]]]:
+        """
+        Возвращает заголовки листа ссылок и словарь ссылка → номер строки.
+        Столбец ссылок читается не чаще раза в ACTIVE_LINKS_TTL секунд.
+        """
+        cached = self._link_index
+        if cached is not None and time.monotonic() - cached[0] < ACTIVE_LINKS_TTL:
+            return cached[1], cached[2]
 
-            if "Ссылка" not in headers:
-                logger.error(
-                    "Колонка 'Ссылка' не найдена в листе пригласительных ссылок"
-                )
-                return None
-
-            link_index = headers.index("Ссылка")
-
-            # Нормализуем входящую ссылку
-            # Исправлено: убраны лишние пробелы
-            normalized_link = link.strip()
-            if not normalized_link.startswith("https://t.me/+"):
-                # Если это короткая ссылка, пытаемся нормализовать
-                if normalized_link.startswith("https://t.me/"):
-                    normalized_link = normalized_link
-                elif normalized_link.startswith("+"):
-                    normalized_link = f"https://t.me/{normalized_link}"
-                elif normalized_link:
-                    normalized_link = f"https://t.me/+{normalized_link}"
-
-            for row in all_values[1:]:
-                if len(row) > link_index:
-                    stored_link = str(row[link_index]).strip()
-                    if stored_link == normalized_link:
-                        return dict(zip(headers, row))
+        # Читаем только заголовки и столбец ссылок, а не весь лист
+        headers, links = self._read_column(sheet, INVITE_LINKS_HEADERS, "Ссылка")
+        if not headers:
             return None
-        except Exception as e:
-            logger.error(f"Ошибка при поиске строки: {e}")
+        if links is None:
+            logger.error("Колонка 'Ссылка' не найдена в листе пригласительных ссылок")
             return None
 
+        rows: Dict[str, int] = {}
+        for row_number, stored_link in enumerate(links, 2):
+            rows.setdefault(stored_link.strip(), row_number)
+        self._link_index = (time.monotonic(), headers, rows)
+        return headers, rows
+
+    def _read_column(
+        self, sheet, expected_headers: Sequence[str], column: str
+    ) -> Tuple[List[str], Optional[List[str]]]:
+        """
+        Читает одним запросом batchGet строку заголовков и один столбец листа.
+
+        Столбец берётся по его позиции в `expected_headers`; если фактический
+        заголовок на этой позиции другой, вместо значений возвращается None.
+        """
+        index = list(expected_headers).index(column)
+        letter = rowcol_to_a1(1, index + 1)[:-1]  # "B1" → "B"
+        header_range, column_range = self._read(
+            sheet.batch_get, ["1:1", f"{letter}2:{letter}"]
+        )
+
+        headers = header_range[0] if header_range else []
+        if len(headers) <= index or headers[index] != column:
+            return headers, None
+        return headers, [row[0] if row else "" for row in column_range]
+
     def _get_sheet(self, title: str):
         """Возвращает лист по названию или создаёт новый, если его нет"""
+        worksheet = self._sheets_cache.get(title)
+        if worksheet is None:
+            worksheet = self._sheets_cache[title] = self._open_sheet(title)
+        return worksheet
+
+    def _open_sheet(self, title: str):
+        """Запрашивает лист у API или создаёт новый, если его нет"""
         try:
-            spreadsheet = self.client.open_by_key(Config.SPREADSHEET_ID)
-            return spreadsheet.worksheet(title)
+            return self._read(self.spreadsheet.worksheet, title)
         except WorksheetNotFound:
-            logger.warning(f"Лист '{title}' не найден, создаём новый...")
-            spreadsheet = self.client.open_by_key(Config.SPREADSHEET_ID)
-            worksheet = spreadsheet.add_worksheet(title=title, rows="100", cols="20")
-
-            # Для листов с особыми заголовками сразу добавляем их
-            if title == JOIN_REQUESTS_SHEET_NAME:
-                request_headers = list(HEADERS) + ["channel_id", "channel_name"]
-                worksheet.insert_row(request_headers, index=1)
-                logger.info(f"Заголовки созданы для листа '{title}'")
-            elif title == INVITE_LINKS_SHEET_NAME:
-                link_headers = [
-                    "Имя ссылки",
-                    "Ссылка",
-                    "Имя канала",
-                    "Дата создания ссылки",
-                ]
-                worksheet.insert_row(link_headers, index=1)
-                logger.info(f"Заголовки созданы для листа '{title}'")
-            elif title == MAIN_SHEET_NAME:
-                worksheet.insert_row(HEADERS, index=1)
-                logger.info(f"Заголовки созданы для листа '{title}'")
+            logger.warning("Лист '%s' не найден, создаём новый...", title)
+            worksheet = self._write(
+                self.spreadsheet.add_worksheet, title=title, rows="100", cols="20"
+            )
+
+            # Для листов с известными заголовками сразу добавляем их и запоминаем
+            # как проверенные: первая запись не перечитывает строку 1 нового листа
+            headers = SHEET_HEADERS.get(title)
+            if headers is not None:
+                self._write(worksheet.insert_row, list(headers), index=1)
+                self._headers_checked[worksheet.id] = tuple(headers)
+                logger.info("Заголовки созданы для листа '%s'", title)
 
             return worksheet
 
+    def export_all_values(self) -> Tuple[List[str], List[List[List[str]]]]:
+        """
+        Читает значения всех листов таблицы (для резервной копии).
+
+        Все листы забираются одним запросом batchGet. Если он не удался
+        (например, ответ превысил лимит размера), листы читаются по отдельности —
+        но не после 429: квота уже исчерпана, и N запросов по листам только
+        продлят ограничение.
+
+        :return: (названия листов, значения каждого листа)
+        """
+        worksheets = self._read(self.spreadsheet.worksheets)
+        titles = [sheet.title for sheet in worksheets]
+        try:
+            payload = self._read(
+                self.spreadsheet.values_batch_get,
+                [absolute_range_name(title) for title in titles],
+            )
+            values = [r.get("values", []) for r in payload["valueRanges"]]
+        except APIError as e:
+            if _is_rate_limited(e):
+                raise
+            logger.warning("batchGet не удался (%s), читаем листы по отдельности", e)
+            values = [self._read(sheet.get_all_values) for sheet in worksheets]
+        return titles, values
+
     def health_check(self) -> bool:
-        """Проверяет доступность таблицы"""
+        """Проверяет, что подключение установлено (без запроса к API)"""
+        return self.client is not None and self.sheet is not None
+
+    def deep_health_check(self) -> bool:
+        """
+        Проверяет доступность таблицы запросом к API.
+        Успешный результат считается действительным HEALTH_CHECK_TTL секунд.
+        """
+        if not self.health_check():
+            return False
+        if time.monotonic() - self._last_healthy < HEALTH_CHECK_TTL:
+            return True
         try:
-            self._wait_for_api_limit()
-            return bool(self.sheet.row_count)
+            self._read(
+                self.spreadsheet.fetch_sheet_metadata, {"fields": "spreadsheetId"}
+            )
+            self._last_healthy = time.monotonic()
+            return True
         except Exception as e:
-            logger.error(f"Health check failed: {str(e)}")
+            logger.error("Health check failed: %s", e)
             return False
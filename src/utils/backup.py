@@ -9,82 +9,130 @@
 import asyncio
 from datetime import datetime
 from io import BytesIO
-from typing import Optional
+from typing import List, Optional
 
-import pandas as pd
 from aiogram import Bot
 from aiogram.types import BufferedInputFile
+from gspread.utils import numericise_all
+from openpyxl import Workbook
 
 from configs.config import Config
-from utils.GoogleSheets import GoogleSheetsManager
-from utils.logger import get_logger
+from src.utils.GoogleSheets import GoogleSheetsManager
+from src.utils.logger import get_logger
 
 # === Запускаем логирование ===
 logger = get_logger(__name__)
 
 
 class GoogleTableBackup:
-    def __init__(self, bot: Bot):
+    def __init__(self, bot: Bot, gsheets: Optional[GoogleSheetsManager] = None):
         self.bot = bot
         self.backup_interval_seconds = 60 * 60 * 8  # каждые 8 часов 
-        self.gsheets = GoogleSheetsManager()
+        # Используем уже подключённый менеджер: новое подключение синхронное
+        # и заблокировало бы event loop на время авторизации
+        self.gsheets = gsheets or GoogleSheetsManager()
         self.gc = self.gsheets.client  # Уже подключён через GoogleSheetsManager
 
     async def _download_sheet_to_buffer(self) -> Optional[BytesIO]:
         """
-        Скачивает все листы Google Таблицы и сохраняет их в буфер (в память)
+        Скачивает все листы Google Таблицы и сохраняет их в буфер (в память).
+        gspread синхронный, поэтому запросы выполняются в отдельных потоках
+        и не блокируют обработку апдейтов.
         """
         try:
-            output = BytesIO()
-
-            spreadsheet = self.gc.open_by_key(Config.SPREADSHEET_ID)
-
-            with pd.ExcelWriter(output, engine="openpyxl") as writer:
-                for sheet in spreadsheet.worksheets():
-                    data = sheet.get_all_records()
-                    df = pd.DataFrame(data)
-                    df.to_excel(
-                        writer, index=False, sheet_name=sheet.title[:31]
-                    )  # Ограничение длины имени листа
-
-            output.seek(0)  # Перемещаем курсор в начало файла
+            # Чтение идёт через менеджер: общий лимит запросов и повтор
+            # временных ошибок API
+            titles, values = await asyncio.to_thread(self.gsheets.export_all_values)
+            output = await asyncio.to_thread(self._build_workbook, titles, values)
             logger.info("✅ Таблица успешно загружена в буфер")
             return output
 
         except Exception as e:
-            logger.error(f"❌ Ошибка при подготовке таблицы: {e}", exc_info=True)
+            logger.error("❌ Ошибка при подготовке таблицы: %s", e, exc_info=True)
             return None
 
+    @staticmethod
+    def _build_workbook(titles: List[str], values: List[List[List[str]]]) -> BytesIO:
+        """
+        Записывает значения листов в Excel-файл в памяти.
+        Книга в режиме write_only не хранит объекты ячеек — строки
+        сразу сериализуются в файл.
+        """
+        output = BytesIO()
+        workbook = Workbook(write_only=True)
+
+        for title, rows in zip(titles, values):
+            worksheet = workbook.create_sheet(title[:31])  # Ограничение длины имени
+            if not rows:
+                continue
+            worksheet.append(rows[0])  # Заголовки
+            for row in rows[1:]:
+                # Числа записываем числами, как это делал get_all_records
+                worksheet.append(numericise_all(row))
+
+        workbook.save(output)
+        output.seek(0)  # Перемещаем курсор в начало файла
+        return output
+
     async def _send_backup_to_admins(self, file_buffer: BytesIO, filename: str):
         """Отправляет Excel-файл всем админам как документ"""
         try:
             input_file = BufferedInputFile(file_buffer.getvalue(), filename=filename)
 
-            for admin_id in Config.TELEGRAM_ADMIN_IDS:
-                await self.bot.send_document(chat_id=admin_id, document=input_file)
-                logger.info(f"📩 Резервная копия отправлена админу {admin_id}")
+            # Отправляем всем админам параллельно: ошибка для одного
+            # не мешает доставке остальным
+            admin_ids = list(Config.TELEGRAM_ADMIN_IDS)
+            results = await asyncio.gather(
+                *(
+                    self.bot.send_document(chat_id=admin_id, document=input_file)
+                    for admin_id in admin_ids
+                ),
+                return_exceptions=True,
+            )
+            for admin_id, result in zip(admin_ids, results):
+                if isinstance(result, BaseException):
+                    logger.error(
+                        "❌ Ошибка при отправке файла админу %s: %s", admin_id, result
+                    )
+                else:
+                    logger.info("📩 Резервная копия отправлена админу %s", admin_id)
 
         except Exception as e:
-            logger.error(f"❌ Ошибка при отправке файла: {e}", exc_info=True)
+            logger.error("❌ Ошибка при отправке файла: %s", e, exc_info=True)
 
     async def run_backup_loop(self):
-        """Цикл резервного копирования таблицы"""
+        """
+        Цикл резервного копирования таблицы.
+        Запуски идут по расписанию от старта цикла: время самого бэкапа
+        не сдвигает следующие запуски.
+        """
         logger.info("🔄 Запуск фоновой задачи резервного копирования Google Таблицы")
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
 
         while True:
+            next_run += self.backup_interval_seconds
             timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
             filename = f"backup_{timestamp}.xlsx"
 
             try:
                 file_buffer = await self._download_sheet_to_buffer()
                 if file_buffer:
-                    await self._send_backup_to_admins(file_buffer, filename)
+                    # Закрываем буфер сразу после отправки, чтобы копия таблицы
+                    # не занимала память до следующего запуска
+                    with file_buffer:
+                        await self._send_backup_to_admins(file_buffer, filename)
                     logger.info("🧹 Буфер очищен после отправки")
             except Exception as e:
-                logger.error(f"❌ Ошибка в цикле бэкапа: {e}", exc_info=True)
-
-            # Ждём перед следующим запуском
-            logger.info(
-                f"💤 Ожидание {self.backup_interval_seconds // 60} минут до следующего бэкапа..."
-            )
-            await asyncio.sleep(self.backup_interval_seconds)
+                logger.error("❌ Ошибка в цикле бэкапа: %s", e, exc_info=True)
+
+            # Ждём до следующего запуска по расписанию
+            delay = next_run - loop.time()
+            if delay < 0:
+                logger.warning(
+                    "⚠️ Бэкап занял больше интервала (на %d с), расписание сдвинуто",
+                    -delay,
+                )
+                next_run, delay = loop.time(), 0
+            logger.info("💤 Ожидание %d минут до следующего бэкапа...", delay // 60)
+            await asyncio.sleep(delay)
@@ -0,0 +1,159 @@
+"""
+Модуль batcher.py
+
+Фоновая пакетная запись в Google Таблицу.
+Хэндлеры кладут данные в очередь и сразу отвечают пользователю, а фоновая
+задача собирает записи в пакеты и отправляет каждый пакет одним запросом к API.
+"""
+
+import asyncio
+from typing import Any, Callable, List, Optional
+
+from src.utils.logger import get_logger
+
+# === Запускаем логирование ===
+logger = get_logger(__name__)
+
+# Значения по умолчанию
+BATCH_SIZE = 50  # Максимум записей в одном пакете
+FLUSH_INTERVAL = 2.0  # Сколько секунд ждать добора пакета после первой записи
+FLUSH_ATTEMPTS = 3  # Сколько раз пробовать записать пакет, прежде чем отбросить его
+
+
+class SheetBatcher:
+    """
+    Очередь записей с фоновой пакетной отправкой.
+
+    Пакет отправляется, когда в нём набралось `batch_size` записей
+    или с момента первой записи прошло `flush_interval` секунд.
+    Если записать пакет не удалось, он возвращается в начало очереди
+    и повторяется через `flush_interval` секунд — до `FLUSH_ATTEMPTS` попыток.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        after_flush: Optional[Callable[[List[Any]], None]] = None,
+    ):
+        """
+        Args:
+            after_flush: Необязательный колбэк, вызывается в event loop
+                после успешной записи пакета (например, для сброса кэша).
+        """
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.after_flush = after_flush
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._pending: List[Any] = []  # Пакет, который собирается прямо сейчас
+        self._flush_func: Optional[Callable[[List[Any]], bool]] = None
+        self._failures = 0  # Неудачных попыток записи текущего пакета подряд
+
+    async def put(self, item: Any) -> None:
+        """Добавляет запись в очередь на запись"""
+        await self.queue.put(item)
+
+    async def run(self, flush_func: Callable[[List[Any]], bool]):
+        """
+        Цикл пакетной записи.
+
+        Args:
+            flush_func: Синхронная функция записи пакета (например, метод
+                GoogleSheetsManager). Выполняется в отдельном потоке,
+                чтобы не блокировать event loop.
+        """
+        self._flush_func = flush_func
+        loop = asyncio.get_running_loop()
+        logger.info(f"🔄 Запуск пакетной записи: {self.name}")
+
+        while True:
+            # Непустой пакет здесь — это возвращённый после ошибки записи
+            if not self._pending:
+                self._pending.append(await self.queue.get())
+            deadline = loop.time() + self.flush_interval
+
+            # Добираем пакет, пока не истёк интервал или не набран размер
+            while len(self._pending) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                self._pending.append(item)
+
+            # Отмена задачи не прерывает начатую запись: поток с запросом
+            # всё равно довёл бы её до конца, а flush() при остановке бота
+            # шёл бы параллельно с ней
+            write = asyncio.ensure_future(self._write_pending())
+            try:
+                written = await asyncio.shield(write)
+            except asyncio.CancelledError:
+                await write
+                raise
+
+            if not written:
+                # Даём API время (в том числе на паузу после 429) до повтора
+                await asyncio.sleep(self.flush_interval)
+
+    async def flush(self):
+        """
+        Записывает всё, что осталось в очереди (вызывается при остановке бота).
+        Неудачная запись повторяется, пока не исчерпаны попытки.
+        """
+        while not self.queue.empty():
+            self._pending.append(self.queue.get_nowait())
+        while not await self._write_pending():
+            await asyncio.sleep(self.flush_interval)
+
+    async def _write_pending(self) -> bool:
+        """
+        Отправляет накопленный пакет одним вызовом `flush_func`.
+
+        Returns:
+            True, если пакет записан (или записывать нечего). При ошибке пакет
+            возвращается в начало очереди, а после `FLUSH_ATTEMPTS` неудачных
+            попыток подряд — отбрасывается.
+        """
+        if not self._pending or self._flush_func is None:
+            return True
+        batch, self._pending = self._pending, []
+
+        try:
+            written = await asyncio.to_thread(self._flush_func, batch)
+        except Exception as e:
+            logger.error(
+                f"Ошибка при пакетной записи ({self.name}): {e}", exc_info=True
+            )
+            written = False
+
+        if written:
+            self._failures = 0
+            if self.after_flush is not None:
+                try:
+                    self.after_flush(batch)
+                except Exception as e:
+                    logger.error(
+                        f"Ошибка после записи пакета ({self.name}): {e}", exc_info=True
+                    )
+            return True
+
+        self._failures += 1
+        if self._failures >= FLUSH_ATTEMPTS:
+            logger.error(
+                f"Пакет ({self.name}) не записан за {self._failures} попытки, "
+                f"записи потеряны: {len(batch)}"
+            )
+            self._failures = 0
+            return False
+
+        logger.warning(
+            f"Не удалось записать пакет ({self.name}): {len(batch)}, "
+            f"повтор через {self.flush_interval} с"
+        )
+        # Пакет возвращается в начало: записи, пришедшие позже, пойдут после него
+        self._pending = batch + self._pending
+        return False
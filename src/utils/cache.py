@@ -0,0 +1,55 @@
+"""
+Модуль cache.py
+
+Кэш результатов чтения из Google Таблицы с ограниченным временем жизни.
+Администратор часто переходит назад/вперёд по меню за несколько секунд —
+повторные чтения в пределах `READ_CACHE_TTL` берутся из кэша, не расходуя квоту API.
+"""
+
+import asyncio
+from typing import Any, Callable, Dict, Hashable
+
+from cachetools import TTLCache
+
+READ_CACHE_TTL = 30  # Время жизни записи кэша (в секундах)
+
+_cache: TTLCache = TTLCache(maxsize=128, ttl=READ_CACHE_TTL)
+# Блокировка на ключ: одновременные запросы одного ключа ждут первый,
+# а не отправляют одинаковые запросы к API. Блокировка живёт только
+# на время чтения, чтобы словарь не рос вместе с числом ключей
+_locks: Dict[Hashable, asyncio.Lock] = {}
+
+
+async def cached_read(key: Hashable, func: Callable[..., Any], *args) -> Any:
+    """
+    Возвращает результат `func(*args)` из кэша или выполняет чтение.
+
+    Args:
+        key: Ключ кэша, например `("pending", channel_id)`
+        func: Синхронная функция чтения (метод GoogleSheetsManager).
+            Выполняется в отдельном потоке, чтобы не блокировать event loop.
+    """
+    value = _cache.get(key)
+    if value is not None:
+        return value
+
+    lock = _locks.get(key)
+    if lock is None:
+        lock = _locks[key] = asyncio.Lock()
+    try:
+        async with lock:
+            value = _cache.get(key)
+            if value is None:
+                value = await asyncio.to_thread(func, *args)
+                _cache[key] = value
+    finally:
+        # Ожидающие уже держат ссылку на блокировку; новые запросы найдут
+        # значение в кэше
+        if _locks.get(key) is lock:
+            del _locks[key]
+    return value
+
+
+def invalidate(key: Hashable) -> None:
+    """Удаляет запись из кэша (после изменения данных в таблице)"""
+    _cache.pop(key, None)
@@ -0,0 +1,61 @@
+"""
+Модуль chat_titles.py
+
+Общий кэш названий каналов с ограниченным временем жизни.
+Название канала нужно почти в каждом меню, а запрос `get_chat` к Telegram API
+при каждом нажатии кнопки — лишняя сетевая задержка.
+"""
+
+import asyncio
+from time import monotonic
+
+from aiogram import Bot
+
+from configs.config import Config
+from src.utils.logger import get_logger
+
+# === Запускаем логирование ===
+logger = get_logger(__name__)
+
+CHAT_TITLE_TTL = 600  # Время жизни кэша названий каналов (в секундах)
+_chat_title_cache: dict[int, tuple[float, str]] = {}
+
+
+async def get_chat_title(bot: Bot, channel_id: int | str) -> str:
+    """
+    Возвращает название канала, используя кэш с ограниченным временем жизни.
+
+    Запрос `get_chat` к Telegram API выполняется только при отсутствии
+    записи в кэше или по истечении `CHAT_TITLE_TTL`.
+    Ошибки Telegram API пробрасываются вызывающему коду.
+    """
+    channel_id = int(channel_id)
+    cached = _chat_title_cache.get(channel_id)
+    if cached and monotonic() - cached[0] < CHAT_TITLE_TTL:
+        return cached[1]
+
+    chat = await bot.get_chat(channel_id)
+    title = chat.title or str(channel_id)
+    _chat_title_cache[channel_id] = (monotonic(), title)
+    return title
+
+
+async def warm_chat_titles(bot: Bot) -> None:
+    """Заранее загружает названия всех каналов из конфигурации (при запуске бота)"""
+    results = await asyncio.gather(
+        *(
+            get_chat_title(bot, channel_id)
+            for channel_id in Config.TELEGRAM_CHANNEL_IDS
+        ),
+        return_exceptions=True,
+    )
+    for channel_id, result in zip(Config.TELEGRAM_CHANNEL_IDS, results):
+        if isinstance(result, Exception):
+            logger.warning(
+                f"Не удалось получить название канала {channel_id}: {result}"
+            )
+
+
+def clear_chat_title_cache() -> None:
+    """Очищает кэш названий каналов"""
+    _chat_title_cache.clear()
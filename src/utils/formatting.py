@@ -0,0 +1,21 @@
+"""
+Модуль formatting.py
+
+Вспомогательные функции форматирования текста.
+"""
+
+# Таблица замен для экранирования HTML (те же замены, что и в `html.escape`)
+_HTML_TABLE = str.maketrans(
+    {
+        "&": "&amp;",
+        "<": "&lt;",
+        ">": "&gt;",
+        '"': "&quot;",
+        "'": "&#x27;",
+    }
+)
+
+
+def escape_html(text: str | None) -> str:
+    """Экранирует HTML-символы за один проход `str.translate`"""
+    return text.translate(_HTML_TABLE) if text else ""
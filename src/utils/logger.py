@@ -48,11 +48,31 @@ class ColoredFormatter(logging.Formatter):
         "CRITICAL": Back.RED + Fore.WHITE + Style.BRIGHT,
     }
 
+    def __init__(self, fmt=LOG_FORMAT, datefmt=DATE_FORMAT):
+        """Создаёт по готовому форматтеру на каждый уровень логирования.
+
+        Цветной формат собирается один раз, а не на каждую запись, и общий
+        `_style._fmt` не изменяется (это было небезопасно при логировании
+        из нескольких потоков).
+
+        Args:
+            fmt (str): Формат строки лога.
+            datefmt (str): Формат даты и времени.
+        """
+        super().__init__(fmt=fmt, datefmt=datefmt)
+        self._formatters = {
+            level: logging.Formatter(
+                fmt=f"{color}{fmt}{Style.RESET_ALL}", datefmt=datefmt
+            )
+            for level, color in self.COLORS.items()
+        }
+        self._default_formatter = logging.Formatter(
+            fmt=f"{fmt}{Style.RESET_ALL}", datefmt=datefmt
+        )
+
     def format(self, record):
         """Форматирует запись лога, применяя цвет в зависимости от уровня.
 
-        Цвет устанавливается перед вызовом базового метода `format()` родительского класса.
-
         Args:
             record (logging.LogRecord): Объект записи лога.
 
@@ -60,10 +80,8 @@ class ColoredFormatter(logging.Formatter):
             str: Отформатированная строка лога с цветовым выделением.
         """
 
-        log_level = record.levelname
-        color = self.COLORS.get(log_level, "")
-        self._style._fmt = f"{color}{LOG_FORMAT}{Style.RESET_ALL}"
-        return super().format(record)
+        formatter = self._formatters.get(record.levelname, self._default_formatter)
+        return formatter.format(record)
 
 
 def get_logger(name=None):
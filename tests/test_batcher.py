@@ -0,0 +1,160 @@
+"""Тесты фоновой пакетной записи (src/utils/batcher.py)"""
+
+import asyncio
+import os
+import threading
+import unittest
+
+# Минимальные переменные окружения: configs.config проверяет их при импорте
+for _name, _value in {
+    "TELEGRAM_BOT_TOKEN": "123:test",
+    "TELEGRAM_CHANNEL_IDS": "-1001",
+    "TELEGRAM_ADMIN_IDS": "1",
+    "GOOGLE_CREDS_JSON": "creds.json",
+    "SPREADSHEET_ID": "test",
+}.items():
+    os.environ.setdefault(_name, _value)
+
+from src.utils.batcher import FLUSH_ATTEMPTS, SheetBatcher  # noqa: E402
+
+INTERVAL = 0.05  # Короткий интервал, чтобы тесты шли быстро
+
+
+class RecordingWriter:
+    """Функция записи пакета: запоминает пакеты и отвечает по сценарию"""
+
+    def __init__(self, *results):
+        self.results = list(results)  # True / False / исключение на каждую попытку
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def __call__(self, batch):
+        with self.lock:
+            self.batches.append(list(batch))
+            result = self.results.pop(0) if self.results else True
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+async def wait_for(condition, timeout=2.0):
+    """Ждёт, пока `condition()` станет истинным"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not condition():
+        if loop.time() > deadline:
+            raise AssertionError("Условие не выполнилось вовремя")
+        await asyncio.sleep(0.01)
+
+
+class SheetBatcherTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.flushed = []
+        self.tasks = []
+
+    async def asyncTearDown(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def start(self, writer, batch_size=50, flush_interval=INTERVAL):
+        batcher = SheetBatcher(
+            "test",
+            batch_size=batch_size,
+            flush_interval=flush_interval,
+            after_flush=self.flushed.append,
+        )
+        self.tasks.append(asyncio.create_task(batcher.run(writer)))
+        return batcher
+
+    async def test_flushes_when_batch_is_full(self):
+        writer = RecordingWriter()
+        batcher = self.start(writer, batch_size=3, flush_interval=10)
+
+        for item in range(4):
+            await batcher.put(item)
+
+        await wait_for(lambda: writer.batches)
+        self.assertEqual(writer.batches, [[0, 1, 2]])
+        self.assertEqual(self.flushed, [[0, 1, 2]])
+
+    async def test_flushes_after_interval(self):
+        writer = RecordingWriter()
+        batcher = self.start(writer)
+
+        await batcher.put("a")
+        await batcher.put("b")
+
+        await wait_for(lambda: writer.batches)
+        self.assertEqual(writer.batches, [["a", "b"]])
+
+    async def test_failed_batch_is_retried(self):
+        writer = RecordingWriter(False, RuntimeError("API недоступен"), True)
+        batcher = self.start(writer)
+
+        await batcher.put(1)
+        await batcher.put(2)
+
+        await wait_for(lambda: self.flushed)
+        self.assertEqual(writer.batches, [[1, 2], [1, 2], [1, 2]])
+        self.assertEqual(self.flushed, [[1, 2]])
+
+    async def test_retried_batch_keeps_order_with_new_items(self):
+        writer = RecordingWriter(False, True)
+        batcher = self.start(writer)
+
+        await batcher.put(1)
+        await wait_for(lambda: writer.batches)
+        await batcher.put(2)
+
+        await wait_for(lambda: self.flushed)
+        self.assertEqual(self.flushed, [[1, 2]])
+
+    async def test_batch_is_dropped_after_attempts(self):
+        writer = RecordingWriter(*[False] * FLUSH_ATTEMPTS)
+        batcher = self.start(writer)
+
+        await batcher.put("lost")
+        await wait_for(lambda: len(writer.batches) == FLUSH_ATTEMPTS)
+        await batcher.put("next")
+
+        await wait_for(lambda: self.flushed)
+        self.assertEqual(writer.batches[-1], ["next"])
+        self.assertEqual(self.flushed, [["next"]])
+
+    async def test_flush_writes_remaining_items(self):
+        writer = RecordingWriter(False, True)
+        batcher = SheetBatcher("test", flush_interval=INTERVAL)
+        batcher._flush_func = writer  # Как после запуска run()
+
+        await batcher.put(1)
+        await batcher.put(2)
+        await batcher.flush()
+
+        self.assertEqual(writer.batches, [[1, 2], [1, 2]])
+        self.assertTrue(batcher.queue.empty())
+
+    async def test_cancel_waits_for_started_write(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_writer(batch):
+            started.set()
+            release.wait(2)
+            return True
+
+        batcher = self.start(slow_writer)
+        await batcher.put(1)
+        await wait_for(started.is_set)
+
+        task = self.tasks[0]
+        task.cancel()
+        await asyncio.sleep(0.05)
+        self.assertFalse(task.done())  # Запись ещё идёт — задача её ждёт
+
+        release.set()
+        await asyncio.gather(task, return_exceptions=True)
+        self.assertEqual(self.flushed, [[1]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,7 @@
 """
 
 import os
+import sys
 
 # Папки, которые нужно игнорировать
 IGNORE_FOLDERS = {
@@ -30,6 +31,10 @@ IGNORE_FILES = {
     "~",  # Временные файлы редакторов
 }
 
+# Разбиение IGNORE_FILES на точные имена и расширения (для одного вызова endswith)
+IGNORE_EXACT = frozenset(e for e in IGNORE_FILES if not e.startswith("."))
+IGNORE_SUFFIXES = tuple(e for e in IGNORE_FILES if e.startswith("."))
+
 
 def should_ignore(name, is_dir):
     """Определяет, нужно ли игнорировать файл или директорию при выводе.
@@ -44,51 +49,55 @@ def should_ignore(name, is_dir):
 
     if is_dir:
         return name in IGNORE_FOLDERS
-    else:
-        # Игнорируем по имени или по расширению
-        if name in IGNORE_FILES:
-            return True
-        _, ext = os.path.splitext(name)
-        return ext in IGNORE_FILES or name.startswith(".")
-    return False
+    # Игнорируем по имени, по расширению или скрытые файлы
+    return (
+        name in IGNORE_EXACT or name.endswith(IGNORE_SUFFIXES) or name.startswith(".")
+    )
 
 
-def print_tree(start_path, prefix=""):
+def print_tree(start_path, prefix="", out=None):
     """Рекурсивно выводит структуру каталогов в виде ASCII-дерева.
 
     Args:
         start_path (str): Путь к корневой директории для вывода.
         prefix (str): Префикс для отступов (используется при рекурсивных вызовах).
+        out (TextIO, optional): Поток вывода. По умолчанию `sys.stdout`.
 
     Side Effects:
-        Выводит в stdout дерево каталогов с использованием символов псевдографики.
+        Выводит в `out` дерево каталогов с использованием символов псевдографики.
 
     Note:
         Автоматически обрабатывает ошибки доступа к директориям.
     """
+    if out is None:
+        out = sys.stdout
+
+    entries = []
     try:
-        entries = sorted(os.listdir(start_path))
+        # scandir отдаёт тип элемента вместе с именем — без отдельного stat(),
+        # поэтому фильтруем прямо в этом проходе, без промежуточного списка
+        with os.scandir(start_path) as it:
+            for entry in it:
+                is_dir = entry.is_dir()
+                if not should_ignore(entry.name, is_dir):
+                    entries.append((entry.name, entry.path, is_dir))
     except PermissionError:
-        print(f"{prefix}└── [Нет доступа]")
+        out.write(f"{prefix}└── [Нет доступа]\n")
         return
 
-    filtered_entries = []
-    for entry in entries:
-        full_path = os.path.join(start_path, entry)
-        is_dir = os.path.isdir(full_path)
-        if not should_ignore(entry, is_dir):
-            filtered_entries.append((entry, is_dir))
+    entries.sort()  # Имена в каталоге уникальны — сортировка только по имени
+    last_index = len(entries) - 1
 
-    for i, (entry, is_dir) in enumerate(filtered_entries):
-        path = os.path.join(start_path, entry)
-        is_last = i == len(filtered_entries) - 1
+    for i, (name, path, is_dir) in enumerate(entries):
+        is_last = i == last_index
 
         connector = "└── " if is_last else "├── "
-        print(f"{prefix}{connector}{entry}" + ("/" if is_dir else ""))
+        # Одна запись на строку вместо print (отдельные write для текста и "\n")
+        out.write(f"{prefix}{connector}{name}{'/' if is_dir else ''}\n")
 
         if is_dir:
             new_prefix = "    " if is_last else "│   "
-            print_tree(path, prefix + new_prefix)
+            print_tree(path, prefix + new_prefix, out)
 
 
 if __name__ == "__main__":